@@ -63,7 +63,7 @@ class WazuhSQLiteDatabase:
         """Initialize SQLite database with required tables."""
         try:
             self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.connection.execute("PRAGMA journal_mode=WAL")  # Enable WAL mode for better concurrency
+            self.connection.execute("PRAGMA journal_mode=WAL")  # Enable WAL mode so report and alert readers never block ingest
             
             # Check if tables exist and create only if they don't
             cursor = self.connection.cursor()
@@ -102,6 +102,11 @@ class WazuhSQLiteDatabase:
                 self.connection.execute("CREATE INDEX IF NOT EXISTS idx_agent_name ON wazuh_archives(agent_name)")
                 self.connection.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON wazuh_archives(created_at)")
             
+            # Report query indexes: time range seeks that also cover the severity filter and the
+            # per-agent grouping (created outside the block above so existing archives get them too)
+            self.connection.execute("CREATE INDEX IF NOT EXISTS idx_wazuh_ts_level ON wazuh_archives(timestamp, rule_level)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS idx_wazuh_ts_agent ON wazuh_archives(timestamp, agent_id)")
+            
             # Create metadata table for tracking
             self.connection.execute("""
                 CREATE TABLE IF NOT EXISTS fetch_metadata (
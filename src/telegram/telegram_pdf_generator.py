@@ -5,19 +5,30 @@ PDF Report Generator for Telegram Bot
 Creates professional PDF reports from security data
 """
 
+import asyncio
+import atexit
+from collections import OrderedDict
+import copy
+import hashlib
 import io
+from itertools import islice
 import logging
+import multiprocessing
+import os
+import re
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Iterator, Optional, Tuple
 from pathlib import Path
 import sys
-import matplotlib.pyplot as plt
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import pandas as pd
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet1
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+from reportlab.platypus import BaseDocTemplate, SimpleDocTemplate, Frame, PageTemplate, Paragraph, Spacer, Table, LongTable, TableStyle, PageBreak
 from reportlab.platypus import Image as ReportLabImage
 from reportlab.graphics.shapes import Drawing
 from reportlab.graphics.charts.piecharts import Pie
@@ -25,8 +36,16 @@ from reportlab.graphics.charts.barcharts import VerticalBarChart
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+from reportlab import rl_config
 import base64
 
+# Skip ReportLab's per-attribute shape validation unless debugging PDF output
+if not os.environ.get('PDF_DEBUG'):
+    rl_config.shapeChecking = 0
+    rl_config.autoConvertEncoding = 0
+    rl_config.pageCompression = 1
+    rl_config.warnOnMissingFontGlyphs = 0
+
 # Design constants
 BASE_UNIT = 8  # Core spacing/font step size
 TITLE_FONT_SIZE = BASE_UNIT * 4  # 32pt
@@ -34,6 +53,224 @@ SECTION_FONT_SIZE = BASE_UNIT * 3  # 24pt
 SUBSECTION_FONT_SIZE = BASE_UNIT * 2  # 16pt
 BODY_FONT_SIZE = BASE_UNIT * 1.5  # 12pt for readability while aligned to 8-based hierarchy
 
+# Characters that can trigger a markdown conversion in _format_markdown_for_pdf
+MARKDOWN_MARKERS = ('#', '*', '_', '-', '+', '=', '`')
+# PDF worker processes; each one loads ReportLab and pandas, so a couple is enough
+PDF_WORKER_PROCESSES = 2
+# Most recent formatted markdown segments kept by _format_markdown_for_pdf
+MARKDOWN_CACHE_SIZE = 64
+# Maximum body rows per events LongTable; larger reports are split into several tables
+EVENTS_TABLE_CHUNK_ROWS = 500
+# Doubled <b>/<i> open or close tags left behind by overlapping markdown
+DUPLICATE_TAG_PATTERN = re.compile(r'<(/?[bi])>\s*<\1>')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# Single-pass character translations (str.translate walks the string once in C)
+# Non-printable characters stripped from PDF text
+CONTROL_CHARS_TABLE = dict.fromkeys([*range(0x00, 0x09), 0x0b, 0x0c, *range(0x0e, 0x20), *range(0x7f, 0xa0)])
+PLAIN_TEXT_ESCAPE_TABLE = str.maketrans({
+    '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&apos;'
+})
+PLAIN_TEXT_CLEAN_TABLE = {**CONTROL_CHARS_TABLE, **PLAIN_TEXT_ESCAPE_TABLE}
+MARKDOWN_ESCAPE_TABLE = str.maketrans({
+    '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+})
+ERROR_TEXT_TABLE = str.maketrans({'<': None, '>': None, '&': 'and'})
+# Markdown table cells keep their entities but show any remaining tags literally
+TABLE_CELL_ESCAPE_TABLE = str.maketrans({'<': '&lt;', '>': '&gt;'})
+# Zero-width spaces after hyphens and slashes let long agent names and paths wrap
+BREAK_OPPORTUNITY_TABLE = str.maketrans({'-': '-&#8203;', '/': '/&#8203;'})
+# Ampersands that do not already start an HTML entity
+BARE_AMPERSAND_PATTERN = re.compile(r'&(?![a-zA-Z0-9#]+;)')
+# Model reasoning stripped from AI analysis text: whole <think>/<thinking> blocks, then any stray tag
+THINKING_PATTERN = re.compile(
+    r'<(think(?:ing)?)>.*?</\1>|</?think(?:ing)?\b[^>]*>', re.DOTALL | re.IGNORECASE
+)
+EXTRA_BLANK_LINES_PATTERN = re.compile(r'\n\s*\n\s*\n')
+# Runs of two or more consecutive markdown table lines
+MARKDOWN_TABLE_PATTERN = re.compile(r'(?:^\s*\|.*\|\s*$\n?){2,}', re.MULTILINE)
+
+# Markdown constructs rewritten by _format_markdown_for_pdf, in the order they are applied
+EMPTY_HEADING_PATTERN = re.compile(r'^\s*#{1,6}\s*$', re.MULTILINE)
+# Headings of every level in one pass; group 1 is the run of hashes
+HEADING_PATTERN = re.compile(r'^\s*(#{1,5})\s+(.*?)$', re.MULTILINE)
+HEADING_TEMPLATES = {
+    5: '<i><u>{}</u></i>',
+    4: '<b><u>{}</u></b>',
+    3: '<b>{}</b>',
+    2: '<b>{}</b>',
+    1: '<b>{}</b>',
+}
+INLINE_CODE_PATTERN = re.compile(r'`([^`]+)`')
+# Decorative rule lines in one pass; the 'I' alternative is the only one with a group set
+RULE_LINE_PATTERN = re.compile(r'^\s*(?:(I{10,})|([=\-_#\*])\2{10,}|---+)\s*$', re.MULTILINE)
+I_RULE_HTML = '<br/>' + '▌' * 50 + '<br/>'
+RULE_HTML = '<br/>' + '━' * 50 + '<br/>'
+# Shortest runs RULE_LINE_PATTERN can match; text without any of them skips the regex
+RULE_LINE_MARKERS = ('I' * 10, '---', '=' * 11, '_' * 11, '#' * 11, '*' * 11)
+# Also covers plain **bold**: any pair it leaves behind would already have matched
+MULTI_STAR_BOLD_PATTERN = re.compile(r'\*{2,}(.*?)\*{2,}')
+UNDERSCORE_BOLD_PATTERN = re.compile(r'__(.*?)__')
+STAR_ITALIC_PATTERN = re.compile(r'(?<!\S)\*(\S.*?\S)\*(?!\S)')
+UNDERSCORE_ITALIC_PATTERN = re.compile(r'(?<!\S)_(\S.*?\S)_(?!\S)')
+STAR_SEPARATOR_PATTERN = re.compile(r'^\*\*\s*$', re.MULTILINE)
+
+# Severity level names indexed by Wazuh rule level; None falls back to "Level-N"
+SEVERITY_NAMES = ('Info', 'Low', 'Low', 'Medium', None, None, 'High', 'Critical')
+
+# Accent colors and status descriptions per AI risk level
+RISK_COLORS = {
+    'Critical': colors.HexColor('#B91C1C'),
+    'High': colors.HexColor('#D97706'),
+    'Medium': colors.HexColor('#2563EB'),
+    'Low': colors.HexColor('#047857'),
+}
+SECURITY_STATUS_TEXT = {
+    'Critical': 'Sistem memerlukan perhatian segera. Tindakan darurat diperlukan.',
+    'High': 'Risiko tinggi terdeteksi. Monitoring ekstra dan tindakan preventif diperlukan.',
+    'Medium': 'Kondisi keamanan normal dengan beberapa peringatan yang perlu dimonitor.',
+    'Low': 'Sistem dalam kondisi aman. Lanjutkan monitoring rutin.'
+}
+
+# Report colour palette
+PALETTE = {
+    'text_primary': colors.HexColor('#1F2933'),
+    'text_muted': colors.HexColor('#475569'),
+    'accent': colors.HexColor('#4338CA'),
+    'accent_soft': colors.HexColor('#EEF2FF'),
+    'accent_dark': colors.HexColor('#312E81'),
+    'success': colors.HexColor('#047857'),
+    'warning': colors.HexColor('#D97706'),
+    'danger': colors.HexColor('#B91C1C'),
+    'background_muted': colors.HexColor('#F5F7FA')
+}
+
+# Poppins faces registered by PDFReportGenerator._register_fonts
+FONTS = {
+    'regular': 'Poppins-Regular',
+    'medium': 'Poppins-Medium',
+    'semibold': 'Poppins-Semibold',
+    'bold': 'Poppins-Bold'
+}
+
+# Line height of the single-line metrics and agents table cells
+TABLE_LEADING = BODY_FONT_SIZE
+# Fixed row heights (leading + top/bottom padding) so Table does not measure every cell
+METRICS_ROW_HEIGHTS = (TABLE_LEADING + BASE_UNIT * 4, TABLE_LEADING + BASE_UNIT * 3)
+AGENTS_ROW_HEIGHTS = (TABLE_LEADING + BASE_UNIT * 3, TABLE_LEADING + BASE_UNIT * 2)
+
+# Security metrics summary table
+METRICS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), PALETTE['accent']),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 0), (-1, 0), FONTS['semibold']),
+    ('FONTSIZE', (0, 0), (-1, 0), BODY_FONT_SIZE),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), BASE_UNIT * 2),
+    ('TOPPADDING', (0, 0), (-1, 0), BASE_UNIT * 2),
+    ('ALIGN', (0, 0), (1, -1), 'CENTER'),
+    ('ALIGN', (2, 0), (2, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F8FAFC')),
+    ('TEXTCOLOR', (0, 1), (-1, -1), PALETTE['text_primary']),
+    ('FONTNAME', (0, 1), (-1, -1), FONTS['regular']),
+    ('FONTSIZE', (0, 1), (-1, -1), BODY_FONT_SIZE - 1),
+    ('LEFTPADDING', (0, 0), (-1, -1), BASE_UNIT * 1.5),
+    ('RIGHTPADDING', (0, 0), (-1, -1), BASE_UNIT * 1.5),
+    ('TOPPADDING', (0, 1), (-1, -1), BASE_UNIT * 1.5),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), BASE_UNIT * 1.5),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#E2E8F0')),
+    ('LEADING', (0, 0), (-1, -1), TABLE_LEADING),
+])
+
+# Security events table (one per LongTable chunk)
+EVENTS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), PALETTE['danger']),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 0), (-1, 0), FONTS['semibold']),
+    ('FONTSIZE', (0, 0), (-1, 0), BODY_FONT_SIZE - 1),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), BASE_UNIT * 1.5),
+    ('TOPPADDING', (0, 0), (-1, 0), BASE_UNIT * 1.5),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FEF2F2')),
+    ('TEXTCOLOR', (0, 1), (-1, -1), PALETTE['text_primary']),
+    ('FONTNAME', (0, 1), (-1, -1), FONTS['regular']),
+    ('FONTSIZE', (0, 1), (-1, -1), BODY_FONT_SIZE - 2),
+    ('LEFTPADDING', (0, 0), (-1, -1), BASE_UNIT),
+    ('RIGHTPADDING', (0, 0), (-1, -1), BASE_UNIT),
+    ('TOPPADDING', (0, 1), (-1, -1), BASE_UNIT),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), BASE_UNIT),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#FCA5A5')),
+    ('WORDWRAP', (0, 0), (-1, -1), 'CJK'),
+    ('SPLITLONGWORDS', (0, 1), (-1, -1), True),
+    ('ALIGN', (1, 1), (1, -1), 'CENTER'),
+    ('ALIGN', (2, 1), (2, -1), 'CENTER'),
+    ('ALIGN', (5, 1), (5, -1), 'CENTER'),
+])
+
+# Top active agents table
+AGENTS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), PALETTE['success']),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (-1, 0), FONTS['semibold']),
+    ('FONTSIZE', (0, 0), (-1, 0), BODY_FONT_SIZE - 1),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), BASE_UNIT * 1.5),
+    ('TOPPADDING', (0, 0), (-1, 0), BASE_UNIT * 1.5),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#ECFDF5')),
+    ('TEXTCOLOR', (0, 1), (-1, -1), PALETTE['text_primary']),
+    ('FONTNAME', (0, 1), (-1, -1), FONTS['regular']),
+    ('FONTSIZE', (0, 1), (-1, -1), BODY_FONT_SIZE - 2),
+    ('LEFTPADDING', (0, 0), (-1, -1), BASE_UNIT),
+    ('RIGHTPADDING', (0, 0), (-1, -1), BASE_UNIT),
+    ('TOPPADDING', (0, 1), (-1, -1), BASE_UNIT),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), BASE_UNIT),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#A7F3D0')),
+    ('LEADING', (0, 0), (-1, -1), TABLE_LEADING),
+])
+
+# Top rule groups table in the appendices
+GROUPS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), PALETTE['accent_dark']),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+    ('ALIGN', (1, 0), (1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (-1, 0), FONTS['semibold']),
+    ('FONTSIZE', (0, 0), (-1, 0), BODY_FONT_SIZE - 1),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), BASE_UNIT * 1.5),
+    ('TOPPADDING', (0, 0), (-1, 0), BASE_UNIT * 1.5),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#EEF2FF')),
+    ('TEXTCOLOR', (0, 1), (-1, -1), PALETTE['text_primary']),
+    ('FONTNAME', (0, 1), (-1, -1), FONTS['regular']),
+    ('FONTSIZE', (0, 1), (-1, -1), BODY_FONT_SIZE - 2),
+    ('LEFTPADDING', (0, 0), (-1, -1), BASE_UNIT * 1.5),
+    ('RIGHTPADDING', (0, 0), (-1, -1), BASE_UNIT * 1.5),
+    ('TOPPADDING', (0, 1), (-1, -1), BASE_UNIT * 1.5),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), BASE_UNIT * 1.5),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#C7D2FE')),
+])
+
+# Tables parsed from markdown in the AI analysis
+MARKDOWN_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), PALETTE['accent']),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F8FAFC')),
+    ('TEXTCOLOR', (0, 1), (-1, -1), PALETTE['text_primary']),
+    ('LEFTPADDING', (0, 0), (-1, -1), BASE_UNIT * 1.5),
+    ('RIGHTPADDING', (0, 0), (-1, -1), BASE_UNIT * 1.5),
+    ('TOPPADDING', (0, 0), (-1, 0), BASE_UNIT * 1.5),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), BASE_UNIT * 1.5),
+    ('TOPPADDING', (0, 1), (-1, -1), BASE_UNIT),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), BASE_UNIT),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#CBD5F5')),
+    ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+    ('WORDWRAP', (0, 0), (-1, -1), 'CJK'),
+    ('SPLITLONGWORDS', (0, 0), (-1, -1), True),
+])
+
 # Add parent directories to path for importing project modules
 current_dir = Path(__file__).parent
 project_root = current_dir.parent.parent
@@ -46,32 +283,77 @@ logger = logging.getLogger(__name__)
 
 class PDFReportGenerator:
     """Generate professional PDF security reports"""
+
+    # Stylesheet shared by every generator instance; see _get_styles
+    _styles: Optional[StyleSheet1] = None
+    # Guards one-time font registration and stylesheet construction
+    _setup_lock = threading.Lock()
+    _fonts_registered = False
+    # Parsed boilerplate paragraphs keyed by (text, style name); see _static_paragraph
+    _paragraph_cache: Dict[Tuple[str, str], Paragraph] = {}
+    # Formatted markdown keyed by a digest of the source text (LRU); see _format_markdown_for_pdf.
+    # PDFs are built one at a time in each worker process, so it needs no lock
+    _markdown_cache: 'OrderedDict[bytes, str]' = OrderedDict()
     
     def __init__(self):
         self.telegram_config = TelegramBotConfig()
         self.config = self.telegram_config.PDF_CONFIG
-        self.styles = getSampleStyleSheet()
-        self.fonts = {}
-        self.palette = {
-            'text_primary': colors.HexColor('#1F2933'),
-            'text_muted': colors.HexColor('#475569'),
-            'accent': colors.HexColor('#4338CA'),
-            'accent_soft': colors.HexColor('#EEF2FF'),
-            'accent_dark': colors.HexColor('#312E81'),
-            'success': colors.HexColor('#047857'),
-            'warning': colors.HexColor('#D97706'),
-            'danger': colors.HexColor('#B91C1C'),
-            'background_muted': colors.HexColor('#F5F7FA')
-        }
+        self.palette = PALETTE
         self._register_fonts()
-        self._setup_custom_styles()
+        self.styles = self._get_styles(self.fonts, self.palette)
+        # Every report shares the same A4 geometry, so the page template is built once
+        self._page_template = self._build_page_template()
+        # ReportLab rendering is CPU-bound; worker processes are started on first use
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # The webapp shares this generator across request threads
+        self._pool_lock = threading.Lock()
+        self._shutdown_registered = False
     
+    def _build_page_template(self) -> PageTemplate:
+        """Build the single-frame A4 page template used for every report page."""
+        margins = self.config['margins']
+        page_width, page_height = A4
+        frame = Frame(
+            margins['left'],
+            margins['bottom'],
+            page_width - margins['left'] - margins['right'],
+            page_height - margins['top'] - margins['bottom'],
+            id='normal'
+        )
+        return PageTemplate(id='report', frames=[frame], pagesize=A4)
+
+    def _static_paragraph(self, text: str, style_name: str) -> Paragraph:
+        """Return a fresh copy of a cached paragraph for fixed boilerplate text."""
+        key = (text, style_name)
+        cached = self._paragraph_cache.get(key)
+        if cached is None:
+            cached = self._paragraph_cache[key] = Paragraph(text, self.styles[style_name])
+        # Paragraphs keep layout state after wrap, so each story gets its own copy
+        return copy.copy(cached)
+
+    def _cached_cell(self, text: str, style: ParagraphStyle, cache: Dict[str, Paragraph]) -> Paragraph:
+        """Return a copy of the table cell paragraph for ``text``, parsing it on first use."""
+        cached = cache.get(text)
+        if cached is None:
+            cached = cache[text] = Paragraph(text, style)
+        return copy.copy(cached)
+
     def _spacer(self, units: float = 1) -> Spacer:
         """Return a spacer using the design base unit."""
         return Spacer(1, BASE_UNIT * units)
     
     def _register_fonts(self):
-        """Register Poppins font family for consistent typography."""
+        """Register Poppins font family for consistent typography (once per process)."""
+        self.fonts = FONTS
+        if PDFReportGenerator._fonts_registered:
+            return
+        with self._setup_lock:
+            if not PDFReportGenerator._fonts_registered:
+                self._load_font_files()
+                PDFReportGenerator._fonts_registered = True
+
+    def _load_font_files(self):
+        """Parse the Poppins TTF files and register them with ReportLab."""
         fonts_dir = Path(self.config.get('font_dir', project_root / 'assets' / 'fonts'))
         font_map = {
             'Regular': fonts_dir / 'Poppins-Regular.ttf',
@@ -94,116 +376,121 @@ class PDFReportGenerator:
             italic='Poppins-Regular',
             boldItalic='Poppins-Semibold'
         )
-        self.fonts = {
-            'regular': 'Poppins-Regular',
-            'medium': 'Poppins-Medium',
-            'semibold': 'Poppins-Semibold',
-            'bold': 'Poppins-Bold'
-        }
         
-    def _setup_custom_styles(self):
-        """Setup custom PDF styles for security reports"""
-        normal_style = self.styles['Normal']
-        normal_style.fontName = self.fonts['regular']
+    @classmethod
+    def _get_styles(cls, fonts: Dict[str, str], palette: Dict[str, Any]) -> StyleSheet1:
+        """Return the shared stylesheet, building it on first use"""
+        if cls._styles is None:
+            with cls._setup_lock:
+                if cls._styles is None:
+                    cls._styles = cls._build_styles(fonts, palette)
+        return cls._styles
+
+    @staticmethod
+    def _build_styles(fonts: Dict[str, str], palette: Dict[str, Any]) -> StyleSheet1:
+        """Build custom PDF styles for security reports"""
+        styles = getSampleStyleSheet()
+        normal_style = styles['Normal']
+        normal_style.fontName = fonts['regular']
         normal_style.fontSize = BODY_FONT_SIZE
         normal_style.leading = BODY_FONT_SIZE + (BASE_UNIT // 2)
-        normal_style.textColor = self.palette['text_primary']
+        normal_style.textColor = palette['text_primary']
         normal_style.spaceAfter = BASE_UNIT
 
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='BodyMuted',
             parent=normal_style,
-            textColor=self.palette['text_muted']
+            textColor=palette['text_muted']
         ))
 
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='CustomTitle',
             parent=normal_style,
-            fontName=self.fonts['bold'],
+            fontName=fonts['bold'],
             fontSize=TITLE_FONT_SIZE,
             leading=TITLE_FONT_SIZE + BASE_UNIT,
-            textColor=self.palette['accent_dark'],
+            textColor=palette['accent_dark'],
             alignment=TA_CENTER,
             spaceBefore=BASE_UNIT * 6,
             spaceAfter=BASE_UNIT * 4
         ))
 
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='IntroHeading',
             parent=normal_style,
-            fontName=self.fonts['semibold'],
+            fontName=fonts['semibold'],
             fontSize=SUBSECTION_FONT_SIZE,
             leading=SUBSECTION_FONT_SIZE + BASE_UNIT,
             alignment=TA_CENTER,
-            textColor=self.palette['accent'],
+            textColor=palette['accent'],
             spaceBefore=BASE_UNIT,
             spaceAfter=BASE_UNIT
         ))
 
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='IntroText',
             parent=normal_style,
-            fontName=self.fonts['regular'],
+            fontName=fonts['regular'],
             alignment=TA_CENTER,
-            textColor=self.palette['text_muted'],
+            textColor=palette['text_muted'],
             leading=BODY_FONT_SIZE + BASE_UNIT,
             spaceAfter=BASE_UNIT * 3
         ))
 
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='SectionHeader',
             parent=normal_style,
-            fontName=self.fonts['semibold'],
+            fontName=fonts['semibold'],
             fontSize=SECTION_FONT_SIZE,
             leading=SECTION_FONT_SIZE + BASE_UNIT,
-            textColor=self.palette['accent'],
-            backColor=self.palette['accent_soft'],
+            textColor=palette['accent'],
+            backColor=palette['accent_soft'],
             spaceBefore=BASE_UNIT * 3,
             spaceAfter=BASE_UNIT * 2,
             leftIndent=0,
             borderPadding=BASE_UNIT,
-            borderColor=self.palette['accent_soft'],
+            borderColor=palette['accent_soft'],
             borderWidth=0
         ))
 
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='SubsectionHeader',
             parent=normal_style,
-            fontName=self.fonts['medium'],
+            fontName=fonts['medium'],
             fontSize=SUBSECTION_FONT_SIZE,
             leading=SUBSECTION_FONT_SIZE + (BASE_UNIT // 2),
-            textColor=self.palette['text_primary'],
+            textColor=palette['text_primary'],
             spaceBefore=BASE_UNIT * 2,
             spaceAfter=BASE_UNIT
         ))
 
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='SummaryBox',
             parent=normal_style,
-            fontName=self.fonts['medium'],
-            backColor=self.palette['background_muted'],
-            textColor=self.palette['text_primary'],
-            borderColor=self.palette['accent_soft'],
+            fontName=fonts['medium'],
+            backColor=palette['background_muted'],
+            textColor=palette['text_primary'],
+            borderColor=palette['accent_soft'],
             borderWidth=1,
             borderPadding=BASE_UNIT * 2,
             spaceBefore=BASE_UNIT,
             spaceAfter=BASE_UNIT * 2
         ))
 
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='AlertStyle',
             parent=normal_style,
-            fontName=self.fonts['semibold'],
-            textColor=self.palette['danger'],
+            fontName=fonts['semibold'],
+            textColor=palette['danger'],
             backColor=colors.HexColor('#FEF2F2'),
-            borderColor=self.palette['danger'],
+            borderColor=palette['danger'],
             borderWidth=1,
             borderPadding=BASE_UNIT * 2,
             spaceBefore=BASE_UNIT,
             spaceAfter=BASE_UNIT * 2
         ))
 
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='CodeStyle',
             parent=normal_style,
             fontName='Courier',
@@ -216,10 +503,10 @@ class PDFReportGenerator:
             spaceAfter=BASE_UNIT * 2
         ))
 
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='TableHeader',
             parent=normal_style,
-            fontName=self.fonts['semibold'],
+            fontName=fonts['semibold'],
             fontSize=BODY_FONT_SIZE - 1,
             leading=BODY_FONT_SIZE + (BASE_UNIT // 2),
             alignment=TA_CENTER,
@@ -228,26 +515,72 @@ class PDFReportGenerator:
             spaceAfter=0
         ))
 
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='TableCell',
             parent=normal_style,
-            fontName=self.fonts['regular'],
+            fontName=fonts['regular'],
             fontSize=BODY_FONT_SIZE - 2,
             leading=(BODY_FONT_SIZE - 2) + (BASE_UNIT // 2),
-            textColor=self.palette['text_primary'],
+            textColor=palette['text_primary'],
             spaceBefore=0,
             spaceAfter=BASE_UNIT // 2
         ))
+
+        return styles
     
     async def generate_pdf_report(self, report_data: Dict[str, Any]) -> io.BytesIO:
-        """Generate comprehensive PDF report"""
+        """Generate comprehensive PDF report without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        try:
+            pdf_bytes = await loop.run_in_executor(pool, _build_pdf_in_worker, report_data)
+        except BrokenProcessPool:
+            # A worker died (OOM, crash); the pool can't be reused, so retry once on a new one
+            logger.warning("PDF worker pool broke, restarting it")
+            self._discard_pool(pool)
+            pdf_bytes = await loop.run_in_executor(self._get_pool(), _build_pdf_in_worker, report_data)
+        return io.BytesIO(pdf_bytes)
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Return the PDF worker pool, starting it on first use"""
+        with self._pool_lock:
+            if self._pool is None:
+                # Spawned, not forked: the bot and webapp processes already run several threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=PDF_WORKER_PROCESSES,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                if not self._shutdown_registered:
+                    atexit.register(self.shutdown)
+                    self._shutdown_registered = True
+            return self._pool
+    
+    def _discard_pool(self, pool: ProcessPoolExecutor) -> None:
+        """Drop a broken pool so the next report starts a fresh one"""
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+    
+    def shutdown(self) -> None:
+        """Stop the PDF worker processes"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _build_pdf_sync(self, report_data: Dict[str, Any]) -> bytes:
+        """Build the PDF report synchronously and return its bytes"""
         try:
             logger.info(f"Generating PDF report for {report_data.get('report_type', 'unknown')} report")
             
+            # ReportLab serialises the finished document with a single write(),
+            # so the buffer is sized once and needs no preallocation
             buffer = io.BytesIO()
-            doc = SimpleDocTemplate(
+            doc = BaseDocTemplate(
                 buffer, 
                 pagesize=A4,
+                pageTemplates=[self._page_template],
                 rightMargin=self.config['margins']['right'],
                 leftMargin=self.config['margins']['left'],
                 topMargin=self.config['margins']['top'],
@@ -269,10 +602,9 @@ class PDFReportGenerator:
             
             # Build PDF
             doc.build(story)
-            buffer.seek(0)
             
             logger.info(f"✅ PDF report generated successfully")
-            return buffer
+            return buffer.getvalue()
             
         except Exception as e:
             logger.error(f"Error generating PDF report: {e}")
@@ -281,7 +613,7 @@ class PDFReportGenerator:
             error_doc = SimpleDocTemplate(buffer, pagesize=A4)
             
             # Create simple error message without special characters
-            error_msg = str(e).replace('<', '').replace('>', '').replace('&', 'and')[:200]
+            error_msg = str(e).translate(ERROR_TEXT_TABLE)[:200]
             
             error_story = [
                 Paragraph("PDF Generation Error", self.styles['Title']),
@@ -298,8 +630,7 @@ class PDFReportGenerator:
                 error_story = [Paragraph("PDF Error - Contact Administrator", self.styles['Normal'])]
                 error_doc.build(error_story)
             
-            buffer.seek(0)
-            return buffer
+            return buffer.getvalue()
     
     def _add_title_page(self, story: List, report_data: Dict[str, Any]):
         """Add title page to report"""
@@ -346,7 +677,7 @@ class PDFReportGenerator:
     
     def _add_executive_summary(self, story: List, report_data: Dict[str, Any]):
         """Add executive summary section"""
-        story.append(Paragraph("📋 Executive Summary", self.styles['SectionHeader']))
+        story.append(self._static_paragraph("📋 Executive Summary", 'SectionHeader'))
         
         statistics = report_data.get('statistics', {})
         summary_stats = statistics.get('summary', {})
@@ -388,7 +719,7 @@ class PDFReportGenerator:
     
     def _add_security_metrics(self, story: List, report_data: Dict[str, Any]):
         """Add security metrics section with charts"""
-        story.append(Paragraph("📊 Security Metrics", self.styles['SectionHeader']))
+        story.append(self._static_paragraph("📊 Security Metrics", 'SectionHeader'))
         
         statistics = report_data.get('statistics', {})
         
@@ -422,27 +753,14 @@ class PDFReportGenerator:
             ['Low Events', f"{low_events}", 'Level 0-1 - Low priority events']
         ])
         
-        metrics_table = Table(metrics_data, colWidths=col_widths, repeatRows=1)
-        metrics_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), self.palette['accent']),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), self.fonts['semibold']),
-            ('FONTSIZE', (0, 0), (-1, 0), BODY_FONT_SIZE),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), BASE_UNIT * 2),
-            ('TOPPADDING', (0, 0), (-1, 0), BASE_UNIT * 2),
-            ('ALIGN', (0, 0), (1, -1), 'CENTER'),
-            ('ALIGN', (2, 0), (2, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F8FAFC')),
-            ('TEXTCOLOR', (0, 1), (-1, -1), self.palette['text_primary']),
-            ('FONTNAME', (0, 1), (-1, -1), self.fonts['regular']),
-            ('FONTSIZE', (0, 1), (-1, -1), BODY_FONT_SIZE - 1),
-            ('LEFTPADDING', (0, 0), (-1, -1), BASE_UNIT * 1.5),
-            ('RIGHTPADDING', (0, 0), (-1, -1), BASE_UNIT * 1.5),
-            ('TOPPADDING', (0, 1), (-1, -1), BASE_UNIT * 1.5),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), BASE_UNIT * 1.5),
-            ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#E2E8F0')),
-        ]))
+        header_height, row_height = METRICS_ROW_HEIGHTS
+        metrics_table = Table(
+            metrics_data,
+            colWidths=col_widths,
+            rowHeights=[header_height] + [row_height] * (len(metrics_data) - 1),
+            repeatRows=1
+        )
+        metrics_table.setStyle(METRICS_TABLE_STYLE)
         
         story.append(metrics_table)
         story.append(self._spacer(3))
@@ -450,19 +768,19 @@ class PDFReportGenerator:
         # Add severity distribution chart info
         severity_dist = statistics.get('severity_distribution', {})
         if severity_dist:
-            story.append(Paragraph("Distribusi Tingkat Keamanan:", self.styles['SubsectionHeader']))
+            story.append(self._static_paragraph("Distribusi Tingkat Keamanan:", 'SubsectionHeader'))
             
-            dist_text = ""
+            dist_lines = []
             for level, count in sorted(severity_dist.items(), key=lambda x: int(x[0]), reverse=True):
                 level_name = self._get_severity_name(int(level))
-                dist_text += f"• Level {level} ({level_name}): {count} events<br/>"
+                dist_lines.append(f"• Level {level} ({level_name}): {count} events<br/>")
             
-            story.append(Paragraph(dist_text, self.styles['Normal']))
+            story.append(Paragraph(''.join(dist_lines), self.styles['Normal']))
             story.append(self._spacer(2))
     
     def _add_security_events_analysis(self, story: List, report_data: Dict[str, Any]):
         """Add security events analysis section"""
-        story.append(Paragraph("🔍 Security Events Analysis", self.styles['SectionHeader']))
+        story.append(self._static_paragraph("🔍 Security Events Analysis", 'SectionHeader'))
         
         events = report_data.get('security_events', [])
         
@@ -483,85 +801,87 @@ class PDFReportGenerator:
         scale = min(1.0, available_width / sum(base_widths))
         col_widths = [w * scale for w in base_widths]
 
-        table_rows = [[Paragraph(header, self.styles['TableHeader']) for header in headers]]
-
-        for event in events:
-            # GUNAKAN DATA DARI REPRESENTATIVE_EVENT
-            rep_event = event.get('representative_event', {})
-            
-            timestamp = rep_event.get('timestamp', event.get('latest_occurrence', ''))
-            if timestamp:
-                try:
-                    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    timestamp = dt.strftime('%d/%m %H:%M')
-                except:
-                    timestamp = timestamp[:16]  # Fallback
-            timestamp_display = ''
-            if timestamp:
-                if 'T' in timestamp:
-                    ts = timestamp.replace('T', ' ')
-                else:
-                    ts = timestamp
-                if ' ' in ts:
-                    date_part, time_part = ts.split(' ', 1)
-                    timestamp_display = f"{date_part}<br/>{time_part}"
-                else:
-                    timestamp_display = timestamp
-            else:
-                timestamp_display = 'N/A'
-                    
+        # GUNAKAN DATA DARI REPRESENTATIVE_EVENT
+        rep_events = [event.get('representative_event', {}) for event in events]
+        events_df = pd.DataFrame({
+            'timestamp': [
+                rep_event.get('timestamp', event.get('latest_occurrence', ''))
+                for event, rep_event in zip(events, rep_events)
+            ],
+            'rule_level': [event.get('rule_level', 'N/A') for event in events],
+            'rule_id': [event.get('rule_id', 'N/A') for event in events],
+            'description': [event.get('rule_description', 'N/A') for event in events],
+            'agent': [rep_event.get('agent_name', 'N/A') for rep_event in rep_events],
             # KOLOM JUMLAH TERPISAH
-            count = event.get('count', 1)
-            description_text = self._clean_text_for_pdf(event.get('rule_description', 'N/A'))
-            agent_text = self._clean_text_for_pdf(rep_event.get('agent_name', 'N/A'))
-            location_text = self._clean_text_for_pdf(rep_event.get('location', 'N/A'))
-
-            description_text = description_text.replace('/', '/&#8203;')
-            agent_text = agent_text.replace('-', '-&#8203;').replace('/', '/&#8203;')
-            location_text = location_text.replace('-', '-&#8203;').replace('/', '/&#8203;')
-
-            table_rows.append([
-                Paragraph(timestamp_display or 'N/A', self.styles['TableCell']),
-                Paragraph(self._clean_text_for_pdf(event.get('rule_level', 'N/A')), self.styles['TableCell']),
-                Paragraph(self._clean_text_for_pdf(event.get('rule_id', 'N/A')), self.styles['TableCell']),
-                Paragraph(description_text.replace(' - ', '<br/>- '), self.styles['TableCell']),
-                Paragraph(agent_text, self.styles['TableCell']),
-                Paragraph(str(count), self.styles['TableCell']),
-                Paragraph(location_text, self.styles['TableCell'])
-            ])
-
-        events_table = Table(table_rows, colWidths=col_widths, repeatRows=1)
-        events_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), self.palette['danger']),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), self.fonts['semibold']),
-            ('FONTSIZE', (0, 0), (-1, 0), BODY_FONT_SIZE - 1),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), BASE_UNIT * 1.5),
-            ('TOPPADDING', (0, 0), (-1, 0), BASE_UNIT * 1.5),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FEF2F2')),
-            ('TEXTCOLOR', (0, 1), (-1, -1), self.palette['text_primary']),
-            ('FONTNAME', (0, 1), (-1, -1), self.fonts['regular']),
-            ('FONTSIZE', (0, 1), (-1, -1), BODY_FONT_SIZE - 2),
-            ('LEFTPADDING', (0, 0), (-1, -1), BASE_UNIT),
-            ('RIGHTPADDING', (0, 0), (-1, -1), BASE_UNIT),
-            ('TOPPADDING', (0, 1), (-1, -1), BASE_UNIT),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), BASE_UNIT),
-            ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#FCA5A5')),
-            ('WORDWRAP', (0, 0), (-1, -1), 'CJK'),
-            ('SPLITLONGWORDS', (0, 1), (-1, -1), True),
-            ('ALIGN', (1, 1), (1, -1), 'CENTER'),
-            ('ALIGN', (2, 1), (2, -1), 'CENTER'),
-            ('ALIGN', (5, 1), (5, -1), 'CENTER'),
-        ]))
-        
-        story.append(events_table)
+            'count': [str(event.get('count', 1)) for event in events],
+            'location': [rep_event.get('location', 'N/A') for rep_event in rep_events],
+        }, dtype=object)
+
+        events_df['timestamp'] = (
+            self._format_timestamps(events_df['timestamp'], '%d/%m %H:%M')
+            .str.replace('T', ' ', regex=False)
+            .str.replace(' ', '<br/>', n=1, regex=False)
+            .replace('', 'N/A')
+        )
+        for column in ('description', 'agent', 'location'):
+            events_df[column] = self._clean_series_for_pdf(events_df[column])
+        # Level and rule ID are short codes drawn as plain table strings, so they are not XML-escaped
+        for column in ('rule_level', 'rule_id'):
+            column_values = events_df[column]
+            events_df[column] = column_values.where(column_values.astype(bool), '').astype(str).str.strip()
+
+        events_df['description'] = (
+            events_df['description']
+            .str.replace('/', '/&#8203;', regex=False)
+            .str.replace(' - ', '<br/>- ', regex=False)
+        )
+        for column in ('agent', 'location'):
+            events_df[column] = events_df[column].str.translate(BREAK_OPPORTUNITY_TABLE)
+
+        # Split large dumps into several LongTables so each wrap/split stays bounded.
+        # Rows are pulled from a generator, so only one chunk of cells is materialized at a time.
+        table_rows = self._iter_event_rows(events_df)
+        header_style = self.styles['TableHeader']
+        while True:
+            chunk_rows = [[Paragraph(header, header_style) for header in headers]]
+            chunk_rows.extend(islice(table_rows, EVENTS_TABLE_CHUNK_ROWS))
+            if len(chunk_rows) == 1:
+                break
+            events_table = LongTable(
+                chunk_rows,
+                colWidths=col_widths,
+                repeatRows=1,
+                splitByRow=1,
+                hAlign='LEFT'
+            )
+            events_table.setStyle(EVENTS_TABLE_STYLE)
+            story.append(events_table)
+
         story.append(self._spacer(3))
     
+    def _iter_event_rows(self, events_df: pd.DataFrame) -> Iterator[List[Any]]:
+        """Yield events table body rows from the cleaned events frame.
+
+        Grouped events repeat agents, locations and descriptions, so each distinct
+        cell is parsed once. Level, rule ID and count never need wrapping or markup,
+        so they are drawn as plain strings without a Paragraph.
+        """
+        cell_style = self.styles['TableCell']
+        parsed_cells: Dict[str, Paragraph] = {}
+        for timestamp, level, rule_id, description, agent, count, location in events_df.itertuples(index=False):
+            yield [
+                self._cached_cell(timestamp, cell_style, parsed_cells),
+                level,
+                rule_id,
+                self._cached_cell(description, cell_style, parsed_cells),
+                self._cached_cell(agent, cell_style, parsed_cells),
+                count,
+                self._cached_cell(location, cell_style, parsed_cells),
+            ]
+
     def _add_agent_status_section(self, story: List, report_data: Dict[str, Any]):
         """Add agent status section"""
-        story.append(Paragraph("🖥️ Agent Status Overview", self.styles['SectionHeader']))
+        story.append(self._static_paragraph("🖥️ Agent Status Overview", 'SectionHeader'))
         
         agent_status = report_data.get('agent_status', {})
         agents_detail = agent_status.get('agents_detail', [])
@@ -580,7 +900,7 @@ class PDFReportGenerator:
         story.append(self._spacer(1.5))
         
         if agents_detail:
-            story.append(Paragraph("Top Active Agents:", self.styles['SubsectionHeader']))
+            story.append(self._static_paragraph("Top Active Agents:", 'SubsectionHeader'))
             
             # Create agents table with proper column widths
             agents_data = [
@@ -590,15 +910,11 @@ class PDFReportGenerator:
             # Define optimal column widths for A4 page (total ~500 points)
             col_widths = [90, 60, 50, 65, 65, 120]  # Total: 450
             
-            for agent in agents_detail:
-                last_event = agent.get('last_event', '')
-                if last_event:
-                    try:
-                        dt = datetime.fromisoformat(last_event.replace('Z', '+00:00'))
-                        last_event = dt.strftime('%d/%m/%Y %H:%M')
-                    except:
-                        last_event = last_event[:16]
-                        
+            last_events = self._format_timestamps(
+                [agent.get('last_event', '') for agent in agents_detail], '%d/%m/%Y %H:%M'
+            )
+
+            for agent, last_event in zip(agents_detail, last_events):
                 agents_data.append([
                     self._truncate_text(self._clean_text_for_pdf(agent.get('agent_name', 'N/A')), 15),
                     str(agent.get('agent_id', 'N/A'))[:8] + '...' if len(str(agent.get('agent_id', 'N/A'))) > 8 else str(agent.get('agent_id', 'N/A')),
@@ -608,26 +924,14 @@ class PDFReportGenerator:
                     self._truncate_text(last_event, 15)
                 ])
             
-            agents_table = Table(agents_data, colWidths=col_widths, repeatRows=1)
-            agents_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), self.palette['success']),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('FONTNAME', (0, 0), (-1, 0), self.fonts['semibold']),
-                ('FONTSIZE', (0, 0), (-1, 0), BODY_FONT_SIZE - 1),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), BASE_UNIT * 1.5),
-                ('TOPPADDING', (0, 0), (-1, 0), BASE_UNIT * 1.5),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#ECFDF5')),
-                ('TEXTCOLOR', (0, 1), (-1, -1), self.palette['text_primary']),
-                ('FONTNAME', (0, 1), (-1, -1), self.fonts['regular']),
-                ('FONTSIZE', (0, 1), (-1, -1), BODY_FONT_SIZE - 2),
-                ('LEFTPADDING', (0, 0), (-1, -1), BASE_UNIT),
-                ('RIGHTPADDING', (0, 0), (-1, -1), BASE_UNIT),
-                ('TOPPADDING', (0, 1), (-1, -1), BASE_UNIT),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), BASE_UNIT),
-                ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#A7F3D0')),
-            ]))
+            header_height, row_height = AGENTS_ROW_HEIGHTS
+            agents_table = Table(
+                agents_data,
+                colWidths=col_widths,
+                rowHeights=[header_height] + [row_height] * (len(agents_data) - 1),
+                repeatRows=1
+            )
+            agents_table.setStyle(AGENTS_TABLE_STYLE)
             
             story.append(agents_table)
         
@@ -635,7 +939,7 @@ class PDFReportGenerator:
     
     def _add_ai_analysis_section(self, story: List, report_data: Dict[str, Any]):
         """Add AI analysis section"""
-        story.append(Paragraph("🤖 AI Security Analysis", self.styles['SectionHeader']))
+        story.append(self._static_paragraph("🤖 AI Security Analysis", 'SectionHeader'))
         
         ai_analysis = report_data.get('ai_analysis', {})
         
@@ -653,15 +957,16 @@ class PDFReportGenerator:
         story.append(Paragraph(risk_info, self.styles['SummaryBox']))
         
         # AI Analysis content - Remove thinking tags and render structured segments
-        story.append(Paragraph("Analisis AI:", self.styles['SubsectionHeader']))
+        story.append(self._static_paragraph("Analisis AI:", 'SubsectionHeader'))
         ai_text = ai_analysis.get('ai_analysis', '')
         ai_text = self._remove_thinking_tags(ai_text)
 
         segments = self._split_markdown_tables(ai_text)
+        formatted_text = self._format_text_segments(segments)
 
-        for segment in segments:
+        for index, segment in enumerate(segments):
             if segment['type'] == 'text':
-                formatted_chunk = self._format_markdown_for_pdf(segment['content'])
+                formatted_chunk = formatted_text[index]
                 if formatted_chunk.strip():
                     try:
                         story.append(Paragraph(f"<para>{formatted_chunk}</para>", self.styles['Normal']))
@@ -679,17 +984,17 @@ class PDFReportGenerator:
         # Priority actions
         priority_actions = ai_analysis.get('priority_actions', [])
         if priority_actions:
-            story.append(Paragraph("🚨 Priority Actions:", self.styles['SubsectionHeader']))
+            story.append(self._static_paragraph("🚨 Priority Actions:", 'SubsectionHeader'))
             story.append(self._spacer(0.75))
             
-            actions_text = ""
+            action_lines = []
             for i, action in enumerate(priority_actions, 1):
                 # Clean and format each action
                 clean_action = self._clean_text_for_pdf(action)
                 clean_action = clean_action.replace('**', '')
-                actions_text += f"{i}. {clean_action}<br/>"
+                action_lines.append(f"{i}. {clean_action}<br/>")
             
-            story.append(Paragraph(actions_text, self.styles['AlertStyle']))
+            story.append(Paragraph(''.join(action_lines), self.styles['AlertStyle']))
         
         story.append(self._spacer(3))
     
@@ -700,7 +1005,7 @@ class PDFReportGenerator:
         if not trends or 'analysis' not in trends:
             return
             
-        story.append(Paragraph("📈 Trend Analysis", self.styles['SectionHeader']))
+        story.append(self._static_paragraph("📈 Trend Analysis", 'SectionHeader'))
         
         analysis = trends.get('analysis', {})
         total_events_change = self._safe_float(analysis.get('total_events_change'))
@@ -721,7 +1026,7 @@ class PDFReportGenerator:
     
     def _add_recommendations(self, story: List, report_data: Dict[str, Any]):
         """Add recommendations section"""
-        story.append(Paragraph("💡 Recommendations", self.styles['SectionHeader']))
+        story.append(self._static_paragraph("💡 Recommendations", 'SectionHeader'))
         
         ai_analysis = report_data.get('ai_analysis', {})
         priority_actions = ai_analysis.get('priority_actions', [])
@@ -737,7 +1042,8 @@ class PDFReportGenerator:
         if statistics.get('critical_events', 0) > 5:
             recommendations.append("Investigasi mendalam diperlukan untuk critical events yang tinggi")
         
-        if report_data.get('agent_status', {}).get('active_agents', 0) < report_data.get('agent_status', {}).get('total_agents', 1):
+        agent_status = report_data.get('agent_status', {})
+        if agent_status.get('active_agents', 0) < agent_status.get('total_agents', 1):
             recommendations.append("Periksa dan aktifkan agent yang tidak responsive")
         
         # Default recommendations
@@ -748,21 +1054,21 @@ class PDFReportGenerator:
                 "Pastikan semua agent dalam kondisi optimal"
             ]
         
-        rec_text = ""
+        rec_lines = []
         for i, rec in enumerate(recommendations, 1):
             sanitized = self._clean_text_for_pdf(rec).replace('**', '')
-            rec_text += f"{i}. {sanitized}<br/>"
+            rec_lines.append(f"{i}. {sanitized}<br/>")
         
-        story.append(Paragraph(rec_text, self.styles['Normal']))
+        story.append(Paragraph(''.join(rec_lines), self.styles['Normal']))
         story.append(self._spacer(3))
     
     def _add_appendices(self, story: List, report_data: Dict[str, Any]):
         """Add appendices section"""
         story.append(PageBreak())
-        story.append(Paragraph("📎 Appendices", self.styles['SectionHeader']))
+        story.append(self._static_paragraph("📎 Appendices", 'SectionHeader'))
         
         # Report metadata
-        story.append(Paragraph("Report Metadata:", self.styles['SubsectionHeader']))
+        story.append(self._static_paragraph("Report Metadata:", 'SubsectionHeader'))
         
         metadata_text = f"""
         • Report Type: {report_data.get('report_type', 'Unknown').title()}<br/>
@@ -780,39 +1086,27 @@ class PDFReportGenerator:
         top_groups = statistics.get('top_rule_groups', [])
         
         if top_groups:
-            story.append(Paragraph("Top Rule Groups:", self.styles['SubsectionHeader']))
+            story.append(self._static_paragraph("Top Rule Groups:", 'SubsectionHeader'))
             
             # Improved table with proper column widths
             groups_data = [['Rule Group', 'Event Count']]
             col_widths = [350, 100]  # Total: 450
-            
-            for group in top_groups[:10]:
+
+            # Clean each distinct group name once; top groups often repeat the same string
+            top_groups = top_groups[:10]
+            cleaned_names = {
+                raw: self._truncate_text(self._clean_text_for_pdf(raw), 60)
+                for raw in {group.get('rule_groups', 'N/A') for group in top_groups}
+            }
+
+            for group in top_groups:
                 groups_data.append([
-                    self._truncate_text(self._clean_text_for_pdf(group.get('rule_groups', 'N/A')), 60),
+                    cleaned_names[group.get('rule_groups', 'N/A')],
                     str(group.get('count', 0))
                 ])
             
             groups_table = Table(groups_data, colWidths=col_widths, repeatRows=1)
-            groups_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), self.palette['accent_dark']),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('FONTNAME', (0, 0), (-1, 0), self.fonts['semibold']),
-                ('FONTSIZE', (0, 0), (-1, 0), BODY_FONT_SIZE - 1),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), BASE_UNIT * 1.5),
-                ('TOPPADDING', (0, 0), (-1, 0), BASE_UNIT * 1.5),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#EEF2FF')),
-                ('TEXTCOLOR', (0, 1), (-1, -1), self.palette['text_primary']),
-                ('FONTNAME', (0, 1), (-1, -1), self.fonts['regular']),
-                ('FONTSIZE', (0, 1), (-1, -1), BODY_FONT_SIZE - 2),
-                ('LEFTPADDING', (0, 0), (-1, -1), BASE_UNIT * 1.5),
-                ('RIGHTPADDING', (0, 0), (-1, -1), BASE_UNIT * 1.5),
-                ('TOPPADDING', (0, 1), (-1, -1), BASE_UNIT * 1.5),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), BASE_UNIT * 1.5),
-                ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#C7D2FE')),
-            ]))
+            groups_table.setStyle(GROUPS_TABLE_STYLE)
             
             story.append(groups_table)
     
@@ -845,48 +1139,25 @@ class PDFReportGenerator:
 
     def _get_risk_color(self, risk_level: str):
         """Get accent color for risk level."""
-        color_map = {
-            'Critical': colors.HexColor('#B91C1C'),
-            'High': colors.HexColor('#D97706'),
-            'Medium': colors.HexColor('#2563EB'),
-            'Low': colors.HexColor('#047857'),
-        }
-        return color_map.get(risk_level, self.palette['text_muted'])
+        return RISK_COLORS.get(risk_level, self.palette['text_muted'])
     
     def _get_security_status_text(self, risk_level: str) -> str:
         """Get security status description"""
-        status_map = {
-            'Critical': 'Sistem memerlukan perhatian segera. Tindakan darurat diperlukan.',
-            'High': 'Risiko tinggi terdeteksi. Monitoring ekstra dan tindakan preventif diperlukan.',
-            'Medium': 'Kondisi keamanan normal dengan beberapa peringatan yang perlu dimonitor.',
-            'Low': 'Sistem dalam kondisi aman. Lanjutkan monitoring rutin.'
-        }
-        return status_map.get(risk_level, 'Status keamanan tidak dapat ditentukan.')
+        return SECURITY_STATUS_TEXT.get(risk_level, 'Status keamanan tidak dapat ditentukan.')
     
     def _get_severity_name(self, level: int) -> str:
         """Get severity level name"""
-        severity_map = {
-            0: 'Info',
-            1: 'Low',
-            2: 'Low',
-            3: 'Medium',
-            6: 'High',
-            7: 'Critical'
-        }
-        return severity_map.get(level, f'Level-{level}')
+        name = SEVERITY_NAMES[level] if 0 <= level < len(SEVERITY_NAMES) else None
+        return name or f'Level-{level}'
 
     def _split_markdown_tables(self, text: str) -> List[Dict[str, Any]]:
         """Split markdown text into narrative and table segments."""
         if not text:
             return [{'type': 'text', 'content': ''}]
 
-        import re
-
         segments: List[Dict[str, Any]] = []
-        table_pattern = re.compile(r'(?:^\s*\|.*\|\s*$\n?){2,}', re.MULTILINE)
-
         last_end = 0
-        for match in table_pattern.finditer(text):
+        for match in MARKDOWN_TABLE_PATTERN.finditer(text):
             before = text[last_end:match.start()]
             if before.strip():
                 segments.append({'type': 'text', 'content': before})
@@ -909,10 +1180,13 @@ class PDFReportGenerator:
 
         return segments or [{'type': 'text', 'content': text}]
 
+    def _format_text_segments(self, segments: List[Dict[str, Any]]) -> Dict[int, str]:
+        """Format the narrative segments, keyed by their index in ``segments``."""
+        return {index: self._format_markdown_for_pdf(segment['content'])
+                for index, segment in enumerate(segments) if segment['type'] == 'text'}
+
     def _parse_markdown_table(self, lines: List[str]) -> Optional[List[List[str]]]:
         """Parse markdown table lines into row data."""
-        import re
-
         cleaned = [line.strip() for line in lines if line.strip()]
         if len(cleaned) < 2:
             return None
@@ -954,38 +1228,43 @@ class PDFReportGenerator:
         available_width = page_width - (self.config['margins']['left'] + self.config['margins']['right'])
         col_widths = [available_width / col_count] * col_count
 
-        table_rows = []
+        header_style = self.styles['TableHeader']
+        cell_style = self.styles['TableCell']
+        table_rows = [None] * len(data)
         for row_index, row in enumerate(data):
-            style_name = 'TableHeader' if row_index == 0 else 'TableCell'
-            styled_row = []
-            for cell in row:
-                clean_cell = self._clean_text_for_pdf(cell or '-', preserve_html=True)
-                clean_cell = clean_cell.replace('<', '&lt;').replace('>', '&gt;').replace('**', '')
-                styled_row.append(Paragraph(clean_cell or '-', self.styles[style_name]))
-            table_rows.append(styled_row)
+            style = header_style if row_index == 0 else cell_style
+            table_rows[row_index] = [
+                Paragraph(self._clean_table_cell(cell) or '-', style)
+                for cell in row
+            ]
 
         table = Table(table_rows, colWidths=col_widths, repeatRows=1, hAlign='LEFT')
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), self.palette['accent']),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F8FAFC')),
-            ('TEXTCOLOR', (0, 1), (-1, -1), self.palette['text_primary']),
-            ('LEFTPADDING', (0, 0), (-1, -1), BASE_UNIT * 1.5),
-            ('RIGHTPADDING', (0, 0), (-1, -1), BASE_UNIT * 1.5),
-            ('TOPPADDING', (0, 0), (-1, 0), BASE_UNIT * 1.5),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), BASE_UNIT * 1.5),
-            ('TOPPADDING', (0, 1), (-1, -1), BASE_UNIT),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), BASE_UNIT),
-            ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#CBD5F5')),
-            ('ALIGN', (0, 1), (0, -1), 'LEFT'),
-            ('WORDWRAP', (0, 0), (-1, -1), 'CJK'),
-            ('SPLITLONGWORDS', (0, 0), (-1, -1), True),
-        ]))
+        table.setStyle(MARKDOWN_TABLE_STYLE)
 
         return table
     
+    def _clean_table_cell(self, cell: str) -> str:
+        """Escape a markdown table cell for use inside a Paragraph."""
+        clean_cell = self._clean_text_for_pdf(cell or '-', preserve_html=True)
+        return clean_cell.translate(TABLE_CELL_ESCAPE_TABLE).replace('**', '')
+
+    def _format_timestamps(self, values, date_format: str) -> pd.Series:
+        """Format ISO timestamps in one vectorized parse, keeping the wall-clock time as written.
+
+        Values that cannot be parsed fall back to their first 16 characters and
+        empty values stay empty.
+        """
+        raw = pd.Series(values, dtype=object).fillna('').astype(str)
+        # Only the date/time part is parsed so a trailing 'Z' or UTC offset is ignored
+        parsed = pd.to_datetime(raw.str.slice(0, 19), format='ISO8601', errors='coerce')
+        return parsed.dt.strftime(date_format).where(parsed.notna(), raw.str.slice(0, 16))
+
+    def _clean_series_for_pdf(self, series: pd.Series) -> pd.Series:
+        """Vectorized _clean_text_for_pdf for a column of plain text values"""
+        text = series.where(series.astype(bool), '').astype(str)
+        text = text.str.translate(PLAIN_TEXT_CLEAN_TABLE)
+        return text.str.replace(WHITESPACE_PATTERN, ' ', regex=True).str.strip()
+
     def _truncate_text(self, text: str, max_length: int) -> str:
         """Truncate text to specified length"""
         if len(text) <= max_length:
@@ -993,47 +1272,57 @@ class PDFReportGenerator:
         return text[:max_length-3] + "..."
     
     def _remove_thinking_tags(self, text: str) -> str:
-        """Remove <thinking></thinking> tags and their content completely"""
-        import re
-        # Remove thinking tags and everything between them
-        pattern = r'<thinking>.*?</thinking>'
-        cleaned_text = re.sub(pattern, '', text, flags=re.DOTALL | re.IGNORECASE)
+        """Remove <think>/<thinking> tags and their content completely"""
+        # Remove thinking blocks together with their content, and any unpaired tags
+        cleaned_text = THINKING_PATTERN.sub('', text)
         
-        # Also remove any remaining thinking-related patterns
-        cleaned_text = re.sub(r'</?thinking[^>]*>', '', cleaned_text, flags=re.IGNORECASE)
-        
-        # Clean up extra whitespace and newlines
-        cleaned_text = re.sub(r'\n\s*\n\s*\n', '\n\n', cleaned_text)  # Replace multiple newlines with double
-        cleaned_text = re.sub(r'^\s*\n', '', cleaned_text)  # Remove leading newlines
+        # Clean up extra whitespace and newlines (strip also drops leading newlines)
+        cleaned_text = EXTRA_BLANK_LINES_PATTERN.sub('\n\n', cleaned_text)
         cleaned_text = cleaned_text.strip()
         
         return cleaned_text
     
     def _format_markdown_for_pdf(self, text: str) -> str:
-        """Format markdown text for PDF display"""
-        import re
-
+        """Format markdown text for PDF display, reusing the result for text seen recently"""
         # Handle None or empty text
         if not text:
             return ""
 
+        # Cached reports are often exported again; a digest key avoids holding the source text
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        cache = self._markdown_cache
+        formatted = cache.get(key)
+        if formatted is not None:
+            cache.move_to_end(key)
+            return formatted
+
+        formatted = self._render_markdown_for_pdf(text)
+        cache[key] = formatted
+        if len(cache) > MARKDOWN_CACHE_SIZE:
+            cache.popitem(last=False)
+        return formatted
+
+    def _render_markdown_for_pdf(self, text: str) -> str:
+        """Convert markdown to ReportLab paragraph markup (uncached)"""
+        # Plain prose only needs line breaks, skip the markdown passes entirely
+        has_markdown = any(marker in text for marker in MARKDOWN_MARKERS) or 'I' * 10 in text
+
         # Escape HTML special characters first so ReportLab won't misinterpret raw content
-        text = (
-            text.replace('&', '&amp;')
-                .replace('<', '&lt;')
-                .replace('>', '&gt;')
-                .replace('"', '&quot;')
-                .replace("'", '&#39;')
-        )
+        text = text.translate(MARKDOWN_ESCAPE_TABLE)
+
+        if not has_markdown:
+            return self._newlines_to_breaks(text)
+
+        # Each pass below is skipped when the text lacks the character it needs, so the
+        # backtracking regex engine only runs over text that can actually match
 
         # Convert markdown headers to HTML-like formatting (from largest to smallest)
         # Remove empty heading markers like "###" or "##"
-        text = re.sub(r'^\s*#{1,6}\s*$', '', text, flags=re.MULTILINE)
-        text = re.sub(r'^\s*#####\s+(.*?)$', r'<i><u>\1</u></i>', text, flags=re.MULTILINE)
-        text = re.sub(r'^\s*####\s+(.*?)$', r'<b><u>\1</u></b>', text, flags=re.MULTILINE)
-        text = re.sub(r'^\s*###\s+(.*?)$', r'<b>\1</b>', text, flags=re.MULTILINE)
-        text = re.sub(r'^\s*##\s+(.*?)$', r'<b>\1</b>', text, flags=re.MULTILINE)
-        text = re.sub(r'^\s*#\s+(.*?)$', r'<b>\1</b>', text, flags=re.MULTILINE)
+        if '#' in text:
+            text = EMPTY_HEADING_PATTERN.sub('', text)
+            text = HEADING_PATTERN.sub(
+                lambda match: HEADING_TEMPLATES[len(match.group(1))].format(match.group(2)), text
+            )
 
         # Handle inline code first by stashing placeholders so later formatting doesn't interfere
         code_placeholders = {}
@@ -1043,45 +1332,59 @@ class PDFReportGenerator:
             code_placeholders[key] = f"<font name=\"Courier\">{match.group(1)}</font>"
             return key
 
-        text = re.sub(r'`([^`]+)`', _store_code, text)
+        if '`' in text:
+            text = INLINE_CODE_PATTERN.sub(_store_code, text)
 
         # Handle repeated characters (decorative lines)
-        text = re.sub(r'^\s*I{10,}\s*$', r'<br/>▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌▌<br/>', text, flags=re.MULTILINE)
-        text = re.sub(r'^\s*([=\-_#\*])\1{10,}\s*$', r'<br/>━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━<br/>', text, flags=re.MULTILINE)
-        text = re.sub(r'^\s*---+\s*$', r'<br/>━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━<br/>', text, flags=re.MULTILINE)
+        if any(marker in text for marker in RULE_LINE_MARKERS):
+            text = RULE_LINE_PATTERN.sub(
+                lambda match: I_RULE_HTML if match.group(1) else RULE_HTML, text
+            )
 
         # Convert markdown bold and italics (restrict italics to standalone markers to avoid code interference)
-        text = re.sub(r'\*{2,}(.*?)\*{2,}', r'<b>\1</b>', text)
-        text = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', text)
-        text = re.sub(r'__(.*?)__', r'<b>\1</b>', text)
-        text = re.sub(r'(?<!\S)\*(\S.*?\S)\*(?!\S)', r'<i>\1</i>', text)
-        text = re.sub(r'(?<!\S)_(\S.*?\S)_(?!\S)', r'<i>\1</i>', text)
-
-        # Convert bullet and numbered lists
-        text = re.sub(r'^\s*[\-\*\+]\s+(.*?)$', r'• \1', text, flags=re.MULTILINE)
-        text = re.sub(r'^(\d+)\. (.*?)$', r'\1. \2', text, flags=re.MULTILINE)
+        if '**' in text:
+            text = MULTI_STAR_BOLD_PATTERN.sub(r'<b>\1</b>', text)
+        if '__' in text:
+            text = UNDERSCORE_BOLD_PATTERN.sub(r'<b>\1</b>', text)
+        if '*' in text:
+            text = STAR_ITALIC_PATTERN.sub(r'<i>\1</i>', text)
+        if '_' in text:
+            text = UNDERSCORE_ITALIC_PATTERN.sub(r'<i>\1</i>', text)
+
+        # Convert bullet lists in a single pass over the lines (numbered lists are kept as-is)
+        lines = text.split('\n')
+        for index, line in enumerate(lines):
+            stripped = line.lstrip()
+            if stripped[:1] in ('-', '*', '+') and stripped[1:2].isspace():
+                lines[index] = '• ' + stripped[2:].lstrip()
+        text = '\n'.join(lines)
 
         # Convert standalone emphasis markers (used as separators)
-        text = re.sub(r'^\*\*\s*$', r'<b>※</b>', text, flags=re.MULTILINE)
+        if '**' in text:
+            text = STAR_SEPARATOR_PATTERN.sub(r'<b>※</b>', text)
 
         # Restore code placeholders
         for key, value in code_placeholders.items():
             text = text.replace(key, value)
 
         # Clean up repeated bold/italic tags caused by overlapping markup
-        text = re.sub(r'<b>\s*<b>', '<b>', text)
-        text = re.sub(r'</b>\s*</b>', '</b>', text)
-        text = re.sub(r'<i>\s*<i>', '<i>', text)
-        text = re.sub(r'</i>\s*</i>', '</i>', text)
-
-        # Replace newlines with HTML breaks and collapse excessive spacing
-        text = text.replace('\n', '<br/>')
-        text = re.sub(r'<br/>\s*<br/>', '<br/><br/>', text)
-        text = re.sub(r'(<br/>){3,}', '<br/><br/>', text)
+        text, replaced = DUPLICATE_TAG_PATTERN.subn(r'<\1>', text)
+        while replaced:
+            text, replaced = DUPLICATE_TAG_PATTERN.subn(r'<\1>', text)
 
+        text = self._newlines_to_breaks(text)
         text = text.replace('**', '')
 
         return text
+
+    def _newlines_to_breaks(self, text: str) -> str:
+        """Replace newlines with HTML breaks and collapse excessive spacing"""
+        # Whitespace-only lines become empty so consecutive breaks sit next to each other
+        text = '<br/>'.join(line if line.strip() else '' for line in text.split('\n'))
+        while '<br/><br/><br/>' in text:
+            text = text.replace('<br/><br/><br/>', '<br/><br/>')
+
+        return text
     
     def _clean_text_for_pdf(self, text: str, preserve_html: bool = False) -> str:
         """Clean text for safe PDF rendering"""
@@ -1092,23 +1395,26 @@ class PDFReportGenerator:
         text = str(text)
         
         if not preserve_html:
-            # Remove or escape problematic characters for plain text
-            text = text.replace('&', '&amp;')
-            text = text.replace('<', '&lt;').replace('>', '&gt;')
-            text = text.replace('"', '&quot;').replace("'", '&apos;')
-        else:
-            # For HTML/markdown formatted text, only escape problematic characters that aren't part of HTML tags
-            import re
-            # Escape & that are not part of HTML entities
-            text = re.sub(r'&(?![a-zA-Z0-9#]+;)', '&amp;', text)
+            # Escape problematic characters, drop non-printable ones and
+            # normalize whitespace for plain text
+            return ' '.join(text.translate(PLAIN_TEXT_CLEAN_TABLE).split())
+
+        # For HTML/markdown formatted text, only escape problematic characters that aren't part of HTML tags
+        # Escape & that are not part of HTML entities
+        text = BARE_AMPERSAND_PATTERN.sub('&amp;', text)
         
         # Remove non-printable characters
-        import re
-        text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]', '', text)
-        
-        if not preserve_html:
-            # Normalize whitespace for plain text
-            text = re.sub(r'\s+', ' ', text)
-            text = text.strip()
+        text = text.translate(CONTROL_CHARS_TABLE)
         
         return text
+
+
+# Per-process generator used by the PDF worker pool
+_worker_generator = None
+
+def _build_pdf_in_worker(report_data: Dict[str, Any]) -> bytes:
+    """Build a PDF inside a pool worker, reusing one generator per process"""
+    global _worker_generator
+    if _worker_generator is None:
+        _worker_generator = PDFReportGenerator()
+    return _worker_generator._build_pdf_sync(report_data)
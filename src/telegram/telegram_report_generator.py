@@ -6,21 +6,26 @@ Integrates with existing Wazuh database and LLM system
 """
 
 import asyncio
+from bisect import bisect_left
+from collections import OrderedDict
+import hashlib
 import sqlite3
 import json
 import logging
+import re
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple
+from functools import lru_cache
+from typing import Awaitable, Dict, List, Any, Optional, Tuple
 from pathlib import Path
 import sys
-import pandas as pd
-from openai import OpenAI
+import threading
+import weakref
 
 # Add parent directories to path for importing project modules
 current_dir = Path(__file__).parent
 project_root = current_dir.parent.parent
 sys.path.insert(0, str(project_root))
-sys.path.insert(0, str(project_root / 'src'))
 
 # Import project components
 from src.database import ChatDatabase
@@ -31,6 +36,222 @@ from config.telegram_bot_config import TelegramBotConfig
 
 logger = logging.getLogger(__name__)
 
+# How long (seconds) a generated report and its AI analysis are reused for repeat requests
+REPORT_CACHE_TTL = {
+    'daily': 5 * 60,
+    'three_daily': 15 * 60,
+    'weekly': 30 * 60,
+    'monthly': 60 * 60
+}
+DEFAULT_REPORT_CACHE_TTL = 5 * 60
+# Most reports and AI analyses kept in memory, least recently used dropped first
+REPORT_CACHE_SIZE = 32
+ANALYSIS_CACHE_SIZE = 32
+# Data sources gathered for every report, in gather order
+REPORT_SOURCES = ('security_events', 'agent_status', 'statistics', 'trends')
+# Statistics kept for closed trend-baseline periods, which no longer change
+CLOSED_PERIOD_STATS_CACHE_SIZE = 64
+
+# Per-connection tuning for the report queries: 256 MB memory-mapped reads, 64 MB page cache
+# and in-memory temp tables for the materialized statistics CTE
+SQLITE_CONNECTION_PRAGMAS = (
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA temp_store=MEMORY'
+)
+
+# Wazuh timestamps are ISO-8601 text ("2025-01-31T12:34:56.789+0000"), which sorts
+# chronologically as plain strings; comparing the raw column lets SQLite seek the
+# timestamp indexes instead of evaluating datetime() on every row
+TIME_RANGE_FILTER = "timestamp >= ? AND timestamp < ?"
+
+# Number of most active agents listed in the agent status summary
+TOP_AGENTS_LIMIT = 10
+
+# Report queries are fixed text, so each connection's statement cache prepares them only once
+# Every agent grouped here logged events in the period, so all of them are active; the
+# window count carries the number of agents on each of the top rows
+AGENT_STATUS_QUERY = f"""
+    SELECT 
+        agent_name,
+        agent_id,
+        COUNT(*) as event_count,
+        MIN(timestamp) as first_event,
+        MAX(timestamp) as last_event,
+        AVG(rule_level) as avg_severity,
+        MAX(rule_level) as max_severity,
+        'active' as status,
+        COUNT(*) OVER () as agent_total
+    FROM wazuh_archives 
+    WHERE {TIME_RANGE_FILTER}
+    AND agent_name IS NOT NULL
+    GROUP BY agent_id, agent_name
+    ORDER BY event_count DESC
+    LIMIT {TOP_AGENTS_LIMIT}
+"""
+
+# One pass over the period: the CTE is read once (SQLite materializes a CTE used more
+# than once) and the summary, severity distribution and top MITRE tactics come back
+# as tagged rows of a single result set. The summary row also carries the
+# critical (9-10), high (7-8), medium (5-6) and low (1-4) bucket counts.
+SECURITY_STATISTICS_QUERY = f"""
+    WITH period_events AS (
+        SELECT agent_id, rule_id, rule_level, rule_mitre_tactic, timestamp
+        FROM wazuh_archives 
+        WHERE {TIME_RANGE_FILTER}
+    )
+    SELECT 
+        'summary' as section,
+        NULL as item,
+        COUNT(*) as count,
+        COUNT(DISTINCT agent_id) as unique_agents,
+        COUNT(DISTINCT rule_id) as unique_rules,
+        AVG(rule_level) as avg_severity,
+        MAX(rule_level) as max_severity,
+        MIN(timestamp) as period_start,
+        MAX(timestamp) as period_end,
+        COUNT(CASE WHEN rule_level BETWEEN 9 AND 10 THEN 1 END) as critical_events,
+        COUNT(CASE WHEN rule_level BETWEEN 7 AND 8 THEN 1 END) as high_events,
+        COUNT(CASE WHEN rule_level BETWEEN 5 AND 6 THEN 1 END) as medium_events,
+        COUNT(CASE WHEN rule_level BETWEEN 1 AND 4 THEN 1 END) as low_events
+    FROM period_events
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'severity', rule_level, COUNT(*), NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL
+        FROM period_events
+        GROUP BY rule_level
+        ORDER BY rule_level DESC
+        LIMIT -1
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'tactic', rule_mitre_tactic, COUNT(*) as count, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL
+        FROM period_events
+        WHERE rule_mitre_tactic IS NOT NULL
+        AND rule_mitre_tactic != ''
+        GROUP BY rule_mitre_tactic
+        ORDER BY count DESC
+        LIMIT 10
+    )
+"""
+
+# Columns of the representative event kept for each rule group
+SECURITY_EVENT_COLUMNS = (
+    'id', 'timestamp', 'agent_id', 'agent_name', 'manager_name',
+    'rule_id', 'rule_level', 'rule_description', 'rule_mitre_tactic',
+    'location', 'decoder_name', 'full_log',
+    'json_data', 'created_at'
+)
+
+def _rule_level_filter(priority_levels: List[int]) -> Tuple[str, List[int]]:
+    """SQL condition and parameters selecting the configured rule levels
+    
+    A contiguous set of levels (the configured 5-16) becomes one BETWEEN range the
+    (timestamp, rule_level) index can scan; anything else falls back to an IN list.
+    """
+    levels = sorted(set(priority_levels))
+    if levels and levels == list(range(levels[0], levels[-1] + 1)):
+        return "rule_level BETWEEN ? AND ?", [levels[0], levels[-1]]
+    return f"rule_level IN ({','.join(['?'] * len(priority_levels))})", list(priority_levels)
+
+@lru_cache(maxsize=16)
+def _security_events_query(level_filter: str) -> str:
+    """Priority events grouped by rule for a rule level condition, built once per shape
+    
+    Returns one row per rule_id: its representative event (highest level, then latest) with
+    the group's event count and timestamp range. Only the representative rows are joined
+    back for their full columns, so the large log/JSON text is never sorted or windowed.
+    """
+    return f"""
+    WITH ranked AS (
+        SELECT 
+            id,
+            COUNT(*) OVER (PARTITION BY rule_id) as event_count,
+            MIN(timestamp) OVER (PARTITION BY rule_id) as earliest_occurrence,
+            MAX(timestamp) OVER (PARTITION BY rule_id) as latest_occurrence,
+            ROW_NUMBER() OVER (
+                PARTITION BY rule_id ORDER BY rule_level DESC, timestamp DESC
+            ) as rule_rank
+        FROM wazuh_archives 
+        WHERE {TIME_RANGE_FILTER}
+        AND {level_filter}
+        AND rule_id IS NOT NULL AND rule_id != 0 AND rule_id != ''
+    )
+    SELECT 
+        {', '.join('e.' + column for column in SECURITY_EVENT_COLUMNS)},
+        ranked.event_count, ranked.earliest_occurrence, ranked.latest_occurrence
+    FROM ranked
+    JOIN wazuh_archives e ON e.id = ranked.id
+    WHERE ranked.rule_rank = 1
+    ORDER BY e.rule_level DESC, ranked.event_count DESC, e.timestamp DESC
+"""
+
+# Model reasoning blocks, then any unpaired <think>/</think> tags left behind
+THINK_BLOCK_PATTERN = re.compile(r'<think>.*?</think>', re.DOTALL | re.IGNORECASE)
+THINK_TAG_PATTERN = re.compile(r'</?think>', re.IGNORECASE)
+# Three or more line breaks (blank lines may hold whitespace), collapsed to one blank line
+EXCESS_NEWLINES_PATTERN = re.compile(r'\n\s*\n\s*\n')
+# Keywords that open a recommendations section in the AI analysis
+RECOMMENDATION_HEADER_PATTERN = re.compile(r'rekomendasi|tindakan|action|langkah', re.IGNORECASE)
+# Indicators of compromise found in the raw alert JSON: IPv4 addresses, URLs and MD5/SHA1/SHA256 hashes
+IOC_IP_PATTERN = re.compile(r'(?<![\d.])(?:(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)\.){3}(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)(?![\d.])')
+IOC_URL_PATTERN = re.compile(r'https?://[^\s"\'\\<>]+')
+IOC_HASH_PATTERN = re.compile(r'\b(?:[a-fA-F0-9]{64}|[a-fA-F0-9]{40}|[a-fA-F0-9]{32})\b')
+# Number of indicators of each kind listed in the AI analysis context
+MAX_CONTEXT_IOCS = 20
+# Bullet or 1.-5. numbered item inside the recommendations section; group 1 is the text
+# after the marker (the marker is matched as a whole, digits inside the text are kept)
+ACTION_BULLET_PATTERN = re.compile(r'(?:[•\-*]+|[1-5]\.)\s*(.*)')
+# Verbs that mark a standalone action line outside the recommendations section
+ACTION_LINE_PATTERN = re.compile(r'monitor|blokir|pastikan|periksa|aktifkan|isolasi', re.IGNORECASE)
+# Number of priority actions kept from the AI analysis
+MAX_PRIORITY_ACTIONS = 5
+
+# Risk score points: one point per threshold the count strictly exceeds
+CRITICAL_EVENT_THRESHOLDS = (0, 1, 5, 10)  # 0-4 points
+HIGH_EVENT_THRESHOLDS = (5, 20)  # 0-2 points
+VOLUME_THRESHOLDS = (1000,)  # 0-1 point
+BASE_RISK_SCORE = 3
+# Risk level indexed by risk score 0-10
+RISK_LEVELS = ('Low',) * 4 + ('Medium',) * 2 + ('High',) * 2 + ('Critical',) * 3
+
+# System prompt for the report analysis, shared by every LLM call
+ANALYST_SYSTEM_PROMPT = """Anda adalah analis keamanan siber ahli yang menganalisis data keamanan dari Wazuh SIEM.
+                        Berikan analisis yang komprehensif dan profesional dalam bahasa Indonesia.
+                        
+                        **INSTRUKSI PENTING:**
+                        1. Anda boleh menggunakan <think>...</think> untuk proses berpikir internal
+                        2. Setelah <think> selesai, berikan analisis yang JELAS dan TERSTRUKTUR  
+                        3. Fokus pada data konkret dari events yang diberikan
+                        4. Berikan rekomendasi yang actionable dan spesifik
+                        
+                        **FORMAT ANALISIS:**
+                        
+                        **RINGKASAN EKSEKUTIF**
+                        - Berikan ringkasan singkat kondisi keamanan saat ini
+                        
+                        **ANALISIS DETAIL SECURITY EVENTS**
+                        - Analisis setiap event dengan detail technical
+                        - Analisis payloads dan detail serangan dari Raw JSON Data
+                        - Identifikasi attack vectors dan techniques
+                        
+                        **INDICATORS OF COMPROMISE (IoCs)**
+                        - IP addresses, URLs dan hashes sudah diekstrak otomatis pada bagian INDICATORS OF COMPROMISE; jangan ekstrak ulang dari JSON
+                        - Nilai setiap IoC dari daftar tersebut: mana yang mencurigakan dan mengapa
+                        - Attack signatures yang terdeteksi
+                        
+                        **PENILAIAN RISIKO**
+                        - Evaluasi tingkat risiko berdasarkan severity dan impact
+                        - Identifikasi potensi dampak bisnis
+                        
+                        **REKOMENDASI TINDAKAN**
+                        Berikan dalam format bullet points:
+                        • Aksi 1: Detail spesifik yang harus dilakukan
+                        • Aksi 2: Detail spesifik yang harus dilakukan
+                        • Aksi 3: Detail spesifik yang harus dilakukan
+                        
+                        Pastikan analisis professional, faktual, dan mudah dipahami oleh tim keamanan."""
+
 class SecurityReportGenerator:
     """Generate security reports using existing Wazuh database and LLM integration"""
     
@@ -43,13 +264,31 @@ class SecurityReportGenerator:
         self.chat_db = ChatDatabase()
         self.mcp_bridge = FastMCPBridge()
         
-        # Initialize LM Studio client (same as existing webapp)
+        # Initialize LM Studio client (same as existing webapp); imported here so
+        # modules that only import this one don't pay for loading the OpenAI SDK
+        from openai import OpenAI
         self.llm_client = OpenAI(
             base_url=self.config.LM_STUDIO_CONFIG['base_url'],
             api_key=self.config.LM_STUDIO_CONFIG['api_key'],
             timeout=None  # No timeout
         )
         self.model = self.config.LM_STUDIO_CONFIG['model']
+        # Report type settings, looked up once instead of on every report
+        self._report_configs: Dict[str, Dict[str, Any]] = getattr(self.config, 'REPORT_TYPES', {})
+        
+        # (report_type, period start) -> (monotonic expiry time, report data), least recently used first
+        self._report_cache: "OrderedDict[Tuple[str, datetime], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # (report_type, period start) -> task generating that report right now
+        self._report_inflight: Dict[Tuple[str, datetime], asyncio.Future] = {}
+        # digest of the LLM prompt context -> (monotonic expiry time, AI analysis), least recently used first
+        self._analysis_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Guards both caches; the webapp drives this instance from several threads' event loops
+        self._cache_lock = threading.Lock()
+        # (start, end) of a closed period -> statistics, least recently used first
+        self._closed_period_stats: "OrderedDict[Tuple[datetime, datetime], Dict[str, Any]]" = OrderedDict()
+        self._closed_period_stats_lock = threading.Lock()
+        # One SQLite connection per worker thread, reused across queries and reports
+        self._local = threading.local()
         
     async def initialize(self):
         """Initialize MCP bridge connection"""
@@ -66,120 +305,87 @@ class SecurityReportGenerator:
             return False
     
     def _get_db_connection(self) -> sqlite3.Connection:
-        """Get database connection with proper configuration"""
+        """Get this thread's database connection, opening and configuring it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        
         conn = sqlite3.connect(self.wazuh_db_path)
         conn.row_factory = sqlite3.Row  # Enable dict-like access
+        for pragma in SQLITE_CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        
+        # Reports only read the archive; the ingest server owns all writes
+        conn.execute('PRAGMA query_only=ON')
+        
+        self._local.conn = conn
         return conn
     
-    def _get_time_range_sql(self, start_time: datetime, end_time: datetime) -> Tuple[str, List]:
-        """Generate SQL time range filter compatible with ISO timestamps."""
-        # Stored timestamps look like 2025-11-02T04:09:04.730+0000
-        # Normalise to "YYYY-MM-DD HH:MM:SS" for comparison
-        time_expr = "datetime(replace(substr(timestamp, 1, 19), 'T', ' ')) BETWEEN ? AND ?"
-        return time_expr, [
-            start_time.strftime('%Y-%m-%d %H:%M:%S'),
-            end_time.strftime('%Y-%m-%d %H:%M:%S')
+    def _get_time_range_params(self, start_time: datetime, end_time: datetime) -> List[str]:
+        """Bind parameters for TIME_RANGE_FILTER"""
+        # Events are matched on whole seconds, like the second-resolution bounds used before:
+        # the end bound is exclusive, one second after the truncated end time
+        end_time = end_time.replace(microsecond=0) + timedelta(seconds=1)
+        return [
+            start_time.isoformat(timespec='seconds'),
+            end_time.isoformat(timespec='seconds')
         ]
     
     async def get_security_events(self, start_time: datetime, end_time: datetime, 
                                  report_type: str = 'daily') -> List[Dict[str, Any]]:
         """Get security events from Wazuh database for specified time range"""
+        return await asyncio.to_thread(self._get_security_events_sync, start_time, end_time, report_type)
+    
+    def _get_security_events_sync(self, start_time: datetime, end_time: datetime,
+                                  report_type: str) -> List[Dict[str, Any]]:
+        """Blocking SQLite part of get_security_events, run in a worker thread"""
         try:
             # Safe access to config with fallback
-            if not hasattr(self.config, 'REPORT_TYPES') or report_type not in self.config.REPORT_TYPES:
+            config = self._report_configs.get(report_type)
+            if config is None:
                 logger.warning(f"Report type '{report_type}' not found in config, using defaults")
                 config = {
                     'priority_levels': [7, 8, 9, 10],  # Default to high/critical
                     'read_all_events': False,
                     'max_events': 100
                 }
-            else:
-                config = self.config.REPORT_TYPES[report_type]
                 
             priority_levels = config['priority_levels']
             read_all_events = config.get('read_all_events', False)
             
             with self._get_db_connection() as conn:
-                # Build query for priority events - TANPA LIMIT, BACA SEMUA!
-                time_filter, time_params = self._get_time_range_sql(start_time, end_time)
-                level_placeholders = ','.join(['?'] * len(priority_levels))
-                
-                query = f"""
-                    SELECT 
-                        id, timestamp, agent_id, agent_name, manager_name,
-                        rule_id, rule_level, rule_description, rule_mitre_tactic,
-                        location, decoder_name, full_log,
-                        json_data, created_at
-                    FROM wazuh_archives 
-                    WHERE {time_filter}
-                    AND rule_level IN ({level_placeholders})
-                    ORDER BY rule_level DESC, timestamp DESC
-                """
-                
+                # Query for priority events - TANPA LIMIT, BACA SEMUA!
                 # HAPUS max_events dari parameter - BACA SEMUA EVENTS!
-                params = time_params + priority_levels
-                cursor = conn.execute(query, params)
-                
-                # Kumpulkan SEMUA events dan kelompokkan berdasarkan rule_id
-                all_events = []
-                events_by_rule = {}
+                # SQLite kelompokkan SEMUA events berdasarkan rule_id, sudah terurut
+                # berdasarkan rule level dan count
+                level_filter, level_params = _rule_level_filter(priority_levels)
+                params = self._get_time_range_params(start_time, end_time) + level_params
+                cursor = conn.execute(_security_events_query(level_filter), params)
                 
-                for row in cursor.fetchall():
-                    if row is None:
-                        continue
-                        
-                    event = dict(row)
-                    if not event or not event.get('rule_id'):
-                        continue
-                        
-                    # JANGAN PARSE! Simpan JSON data asli untuk LLM
-                    all_events.append(event)
-                    
-                    # Kelompokkan berdasarkan rule_id
-                    rule_id = event.get('rule_id')
-                    if not rule_id:
-                        continue
-                        
-                    if rule_id not in events_by_rule:
-                        events_by_rule[rule_id] = {
-                            'count': 0,
-                            'representative_event': event,  # Event pertama sebagai perwakilan + RAW JSON DATA
-                            'rule_description': event.get('rule_description', 'Unknown'),
-                            'rule_level': event.get('rule_level', 0),
-                            'latest_timestamp': event.get('timestamp', ''),
-                            'earliest_timestamp': event.get('timestamp', '')
-                        }
-                    
-                    events_by_rule[rule_id]['count'] += 1
-                    # Update timestamp range - safely
-                    event_timestamp = event.get('timestamp', '')
-                    if event_timestamp and event_timestamp > events_by_rule[rule_id].get('latest_timestamp', ''):
-                        events_by_rule[rule_id]['latest_timestamp'] = event_timestamp
-                    if event_timestamp and event_timestamp < events_by_rule[rule_id].get('earliest_timestamp', ''):
-                        events_by_rule[rule_id]['earliest_timestamp'] = event_timestamp
-                
-                # Convert ke format yang mudah dianalisis LLM
+                # Convert ke format yang mudah dianalisis LLM, langsung dari cursor
+                total_events = 0
                 grouped_events = []
-                for rule_id, group_data in events_by_rule.items():
-                    grouped_event = {
+                for row in cursor:
+                    # JANGAN PARSE! Simpan JSON data asli untuk LLM
+                    event = {column: row[column] for column in SECURITY_EVENT_COLUMNS}
+                    rule_id = event['rule_id']
+                    count = row['event_count']
+                    total_events += count
+                    grouped_events.append({
                         'rule_id': rule_id,
-                        'count': group_data['count'],
-                        'rule_description': group_data['rule_description'],
-                        'rule_level': group_data['rule_level'],
-                        'latest_occurrence': group_data['latest_timestamp'],
-                        'earliest_occurrence': group_data['earliest_timestamp'],
-                        'representative_event': group_data['representative_event'],  # FULL DATA + RAW JSON_DATA
-                        'summary': f"Rule {rule_id}: {group_data['rule_description']} (Level {group_data['rule_level']}) - {group_data['count']} occurrences",
+                        'count': count,
+                        'rule_description': event['rule_description'],
+                        'rule_level': event['rule_level'],
+                        'latest_occurrence': row['latest_occurrence'],
+                        'earliest_occurrence': row['earliest_occurrence'],
+                        'representative_event': event,  # FULL DATA + RAW JSON_DATA
+                        'summary': f"Rule {rule_id}: {event['rule_description']} (Level {event['rule_level']}) - {count} occurrences",
                         # PASTIKAN json_data RAW tersedia untuk LLM
-                        'raw_json_sample': group_data['representative_event'].get('json_data', ''),
-                        'full_log_sample': group_data['representative_event'].get('full_log', '')
-                    }
-                    grouped_events.append(grouped_event)
-                
-                # Sort berdasarkan rule level dan count
-                grouped_events.sort(key=lambda x: (x['rule_level'], x['count']), reverse=True)
+                        'raw_json_sample': event['json_data'],
+                        'full_log_sample': event['full_log']
+                    })
                 
-                logger.info(f"Found {len(all_events)} total events, grouped into {len(grouped_events)} rule types")
+                logger.info(f"Found {total_events} total events, grouped into {len(grouped_events)} rule types")
                 return grouped_events
                 
         except Exception as e:
@@ -188,39 +394,27 @@ class SecurityReportGenerator:
     
     async def get_agent_status_summary(self, start_time: datetime, end_time: datetime) -> Dict[str, Any]:
         """Get agent status summary from database"""
+        return await asyncio.to_thread(self._get_agent_status_summary_sync, start_time, end_time)
+    
+    def _get_agent_status_summary_sync(self, start_time: datetime, end_time: datetime) -> Dict[str, Any]:
+        """Blocking SQLite part of get_agent_status_summary, run in a worker thread"""
         try:
             with self._get_db_connection() as conn:
-                time_filter, time_params = self._get_time_range_sql(start_time, end_time)
-                
                 # Get agent activity summary
-                query = f"""
-                    SELECT 
-                        agent_name,
-                        agent_id,
-                        COUNT(*) as event_count,
-                        MIN(timestamp) as first_event,
-                        MAX(timestamp) as last_event,
-                        AVG(rule_level) as avg_severity,
-                        MAX(rule_level) as max_severity
-                    FROM wazuh_archives 
-                    WHERE {time_filter}
-                    AND agent_name IS NOT NULL
-                    GROUP BY agent_id, agent_name
-                    ORDER BY event_count DESC
-                """
+                time_params = self._get_time_range_params(start_time, end_time)
+                rows = conn.execute(AGENT_STATUS_QUERY, time_params).fetchall()
                 
-                cursor = conn.execute(query, time_params)
+                total_agents = rows[0]['agent_total'] if rows else 0
                 agents = []
-                
-                for row in cursor.fetchall():
+                for row in rows:
                     agent = dict(row)
-                    agent['status'] = 'active' if agent['event_count'] > 0 else 'inactive'
+                    del agent['agent_total']
                     agents.append(agent)
                 
                 return {
-                    'total_agents': len(agents),
-                    'active_agents': len([a for a in agents if a['status'] == 'active']),
-                    'agents_detail': agents[:10]  # Top 10 most active
+                    'total_agents': total_agents,
+                    'active_agents': total_agents,
+                    'agents_detail': agents  # Top 10 most active
                 }
                 
         except Exception as e:
@@ -229,71 +423,78 @@ class SecurityReportGenerator:
     
     async def get_security_statistics(self, start_time: datetime, end_time: datetime) -> Dict[str, Any]:
         """Get comprehensive security statistics"""
+        return await asyncio.to_thread(self._get_security_statistics_sync, start_time, end_time)
+    
+    def _get_closed_period_statistics_sync(self, start_time: datetime, end_time: datetime) -> Dict[str, Any]:
+        """Statistics for a period that has already ended, reused while it stays in the LRU"""
+        key = (start_time, end_time)
+        cache = self._closed_period_stats
+        with self._closed_period_stats_lock:
+            stats = cache.get(key)
+            if stats is not None:
+                cache.move_to_end(key)
+                return stats
+        
+        stats = self._get_security_statistics_sync(start_time, end_time)
+        
+        # Errors come back as {} and are retried on the next report
+        if stats:
+            with self._closed_period_stats_lock:
+                cache[key] = stats
+                if len(cache) > CLOSED_PERIOD_STATS_CACHE_SIZE:
+                    cache.popitem(last=False)
+        return stats
+    
+    def _get_security_statistics_sync(self, start_time: datetime, end_time: datetime) -> Dict[str, Any]:
+        """Blocking SQLite part of get_security_statistics, run in a worker thread"""
         try:
             with self._get_db_connection() as conn:
-                time_filter, time_params = self._get_time_range_sql(start_time, end_time)
-                
-                # Overall statistics
-                stats_query = f"""
-                    SELECT 
-                        COUNT(*) as total_events,
-                        COUNT(DISTINCT agent_id) as unique_agents,
-                        COUNT(DISTINCT rule_id) as unique_rules,
-                        AVG(rule_level) as avg_severity,
-                        MAX(rule_level) as max_severity,
-                        MIN(timestamp) as period_start,
-                        MAX(timestamp) as period_end
-                    FROM wazuh_archives 
-                    WHERE {time_filter}
-                """
-                
-                cursor = conn.execute(stats_query, time_params)
-                stats_row = cursor.fetchone()
-                stats = dict(stats_row) if stats_row else {
-                    'total_events': 0,
-                    'unique_agents': 0, 
-                    'unique_rules': 0,
-                    'avg_severity': 0,
-                    'max_severity': 0,
-                    'period_start': start_time.isoformat(),
-                    'period_end': end_time.isoformat()
-                }
-                
-                # Severity distribution
-                severity_query = f"""
-                    SELECT rule_level, COUNT(*) as count
-                    FROM wazuh_archives 
-                    WHERE {time_filter}
-                    GROUP BY rule_level
-                    ORDER BY rule_level DESC
-                """
-                
-                cursor = conn.execute(severity_query, time_params)
-                severity_dist = {str(row['rule_level']): row['count'] for row in cursor.fetchall()}
+                time_params = self._get_time_range_params(start_time, end_time)
                 
-                # Top MITRE tactics (instead of rule groups)
-                tactics_query = f"""
-                    SELECT rule_mitre_tactic, COUNT(*) as count
-                    FROM wazuh_archives 
-                    WHERE {time_filter}
-                    AND rule_mitre_tactic IS NOT NULL
-                    AND rule_mitre_tactic != ''
-                    GROUP BY rule_mitre_tactic
-                    ORDER BY count DESC
-                    LIMIT 10
-                """
+                stats = None
+                severity_buckets = {}
+                severity_dist = {}
+                top_mitre_tactics = []
+                for row in conn.execute(SECURITY_STATISTICS_QUERY, time_params):
+                    section = row['section']
+                    if section == 'summary':
+                        stats = {
+                            'total_events': row['count'],
+                            'unique_agents': row['unique_agents'],
+                            'unique_rules': row['unique_rules'],
+                            'avg_severity': row['avg_severity'],
+                            'max_severity': row['max_severity'],
+                            'period_start': row['period_start'],
+                            'period_end': row['period_end']
+                        }
+                        severity_buckets = {
+                            bucket: row[bucket]
+                            for bucket in ('critical_events', 'high_events', 'medium_events', 'low_events')
+                        }
+                    elif section == 'severity':
+                        severity_dist[str(row['item'])] = row['count']
+                    else:
+                        top_mitre_tactics.append({'rule_mitre_tactic': row['item'], 'count': row['count']})
                 
-                cursor = conn.execute(tactics_query, time_params)
-                top_mitre_tactics = [dict(row) for row in cursor.fetchall()]
+                if stats is None:
+                    stats = {
+                        'total_events': 0,
+                        'unique_agents': 0, 
+                        'unique_rules': 0,
+                        'avg_severity': 0,
+                        'max_severity': 0,
+                        'period_start': start_time.isoformat(),
+                        'period_end': end_time.isoformat()
+                    }
                 
                 return {
                     'summary': stats,
                     'severity_distribution': severity_dist,
                     'top_mitre_tactics': top_mitre_tactics,
-                    'critical_events': int(severity_dist.get('10', 0) + severity_dist.get('9', 0)),
-                    'high_events': int(severity_dist.get('8', 0) + severity_dist.get('7', 0)),
-                    'medium_events': int(severity_dist.get('6', 0) + severity_dist.get('5', 0)),
-                    'low_events': int(severity_dist.get('4', 0) + severity_dist.get('3', 0) + severity_dist.get('2', 0) + severity_dist.get('1', 0))
+                    'critical_events': severity_buckets.get('critical_events', 0),
+                    'high_events': severity_buckets.get('high_events', 0),
+                    'medium_events': severity_buckets.get('medium_events', 0),
+                    'low_events': severity_buckets.get('low_events', 0)
                 }
                 
         except Exception as e:
@@ -301,10 +502,31 @@ class SecurityReportGenerator:
             return {}
     
     async def analyze_security_trends(self, start_time: datetime, end_time: datetime, 
-                                    compare_previous: bool = True) -> Dict[str, Any]:
-        """Analyze security trends with optional comparison to previous period"""
+                                    compare_previous: bool = True,
+                                    current_stats: Optional[Awaitable[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Analyze security trends with optional comparison to previous period
+        
+        current_stats lets a caller that already computes the statistics for this period
+        share them (e.g. as a task) instead of scanning the period a second time.
+        """
         try:
-            current_stats = await self.get_security_statistics(start_time, end_time)
+            if current_stats is None:
+                current_stats = self.get_security_statistics(start_time, end_time)
+            
+            if compare_previous:
+                # Calculate previous period, as long as the current one; both bounds are floored
+                # to the minute so repeated reports within a minute share one cached baseline
+                period_duration = end_time - start_time
+                prev_end = start_time.replace(second=0, microsecond=0)
+                prev_start = prev_end - period_duration
+                
+                # Both periods are read concurrently on separate connections
+                current_stats, prev_stats = await asyncio.gather(
+                    current_stats,
+                    asyncio.to_thread(self._get_closed_period_statistics_sync, prev_start, prev_end)
+                )
+            else:
+                current_stats = await current_stats
             
             trends = {
                 'current_period': current_stats,
@@ -312,12 +534,6 @@ class SecurityReportGenerator:
             }
             
             if compare_previous:
-                # Calculate previous period
-                period_duration = end_time - start_time
-                prev_end = start_time
-                prev_start = prev_end - period_duration
-                
-                prev_stats = await self.get_security_statistics(prev_start, prev_end)
                 trends['previous_period'] = prev_stats
                 
                 # Calculate changes
@@ -339,107 +555,158 @@ class SecurityReportGenerator:
             logger.error(f"Error analyzing security trends: {e}")
             return {}
     
+    def _source_result(self, source: str, result: Any, default: Any, partial_errors: List[str]) -> Any:
+        """Result of one gathered report source, or its default if it failed or came back empty
+        
+        Failed sources are recorded in partial_errors.
+        """
+        if isinstance(result, Exception):
+            logger.error(f"Error getting {source} for report: {result}")
+            partial_errors.append(source)
+            return default
+        if isinstance(result, BaseException):
+            # Cancellation and interpreter exits are not data errors
+            raise result
+        return result or default
+    
     async def generate_ai_analysis(self, report_data: Dict[str, Any], report_type: str) -> Dict[str, Any]:
         """Generate AI analysis using existing LLM integration (similar to webapp)"""
         try:
             # Prepare analysis context
             analysis_context = self._prepare_analysis_context(report_data, report_type)
             
+            # The same context always gets the same prompt, so reuse a recent answer
+            context_key = hashlib.blake2b(analysis_context.encode('utf-8'), digest_size=16).hexdigest()
+            cached = self._get_cached(self._analysis_cache, context_key)
+            if cached is not None:
+                logger.info(f"Reusing cached AI analysis for {report_type} report")
+                return cached
+            
+            # The risk score only depends on the report data, so it is ready before the
+            # model starts and the text-dependent passes are all that remain afterwards
+            risk_score = self._calculate_risk_score(report_data)
+            
             # Use LLM for analysis (same pattern as webapp_chatbot.py)
-            analysis_response = self.llm_client.chat.completions.create(
+            # The blocking client runs in a worker thread so the event loop keeps serving
+            # other requests while the model generates
+            analysis_response = await asyncio.to_thread(
+                self.llm_client.chat.completions.create,
                 model=self.model,
                 messages=[
-                    {
-                        "role": "system",
-                        "content": """Anda adalah analis keamanan siber ahli yang menganalisis data keamanan dari Wazuh SIEM.
-                        Berikan analisis yang komprehensif dan profesional dalam bahasa Indonesia.
-                        
-                        **INSTRUKSI PENTING:**
-                        1. Anda boleh menggunakan <think>...</think> untuk proses berpikir internal
-                        2. Setelah <think> selesai, berikan analisis yang JELAS dan TERSTRUKTUR  
-                        3. Fokus pada data konkret dari events yang diberikan
-                        4. Berikan rekomendasi yang actionable dan spesifik
-                        
-                        **FORMAT ANALISIS:**
-                        
-                        **RINGKASAN EKSEKUTIF**
-                        - Berikan ringkasan singkat kondisi keamanan saat ini
-                        
-                        **ANALISIS DETAIL SECURITY EVENTS**
-                        - Analisis setiap event dengan detail technical
-                        - Extract IP addresses, URLs, payloads dari JSON data
-                        - Identifikasi attack vectors dan techniques
-                        
-                        **INDICATORS OF COMPROMISE (IoCs)**
-                        - Daftar IP addresses yang mencurigakan
-                        - URLs dan file paths yang terkompromasi
-                        - Attack signatures yang terdeteksi
-                        
-                        **PENILAIAN RISIKO**
-                        - Evaluasi tingkat risiko berdasarkan severity dan impact
-                        - Identifikasi potensi dampak bisnis
-                        
-                        **REKOMENDASI TINDAKAN**
-                        Berikan dalam format bullet points:
-                        • Aksi 1: Detail spesifik yang harus dilakukan
-                        • Aksi 2: Detail spesifik yang harus dilakukan
-                        • Aksi 3: Detail spesifik yang harus dilakukan
-                        
-                        Pastikan analisis professional, faktual, dan mudah dipahami oleh tim keamanan."""
-                    },
-                    {
-                        "role": "user",
-                        "content": analysis_context
-                    }
+                    {"role": "system", "content": ANALYST_SYSTEM_PROMPT},
+                    {"role": "user", "content": analysis_context}
                 ],
                 temperature=self.config.LM_STUDIO_CONFIG['temperature'],
                 max_tokens=self.config.LM_STUDIO_CONFIG['max_tokens']
             )
             
-            ai_analysis = analysis_response.choices[0].message.content
-            
             # Remove thinking tags BEFORE any further processing
-            ai_analysis = self._remove_thinking_tags(ai_analysis)
-            
-            # Calculate risk score based on data
-            risk_score = self._calculate_risk_score(report_data)
+            ai_analysis = self._remove_thinking_tags(analysis_response.choices[0].message.content or '')
             
             # Extract priority actions from AI analysis (now cleaned)
             priority_actions = self._extract_priority_actions(ai_analysis)
             
-            return {
+            analysis = {
                 'ai_analysis': ai_analysis,
                 'risk_score': risk_score,
                 'risk_level': self._get_risk_level(risk_score),
                 'priority_actions': priority_actions,
-                'analysis_timestamp': datetime.now().isoformat()
+                'analysis_timestamp': datetime.now().isoformat(),
+                # False for the fallback summary, so reports without a real analysis aren't cached
+                'ai_generated': True
             }
+            self._store_cached(self._analysis_cache, context_key, analysis, report_type, ANALYSIS_CACHE_SIZE)
+            return analysis
             
         except Exception as e:
             logger.error(f"Error generating AI analysis: {e}")
+            # The report data is still valid, so score it and summarise it without the LLM
+            risk_score = self._calculate_risk_score(report_data)
             return {
-                'ai_analysis': f'Error dalam analisis AI: {str(e)}',
-                'risk_score': 5,
-                'risk_level': 'Medium',
+                'ai_analysis': self._fallback_analysis_text(report_data, e),
+                'risk_score': risk_score,
+                'risk_level': self._get_risk_level(risk_score),
                 'priority_actions': ['Periksa log secara manual'],
-                'analysis_timestamp': datetime.now().isoformat()
+                'analysis_timestamp': datetime.now().isoformat(),
+                'ai_generated': False
             }
     
+    def _fallback_analysis_text(self, report_data: Dict[str, Any], error: Exception) -> str:
+        """Deterministic summary of the report data used when the LLM analysis fails"""
+        statistics = report_data.get('statistics', {})
+        lines = [
+            f"Error dalam analisis AI: {str(error)}",
+            "",
+            "**RINGKASAN OTOMATIS**",
+            f"- Total Events: {statistics.get('summary', {}).get('total_events', 0)}",
+            f"- Critical Events: {statistics.get('critical_events', 0)}",
+            f"- High Events: {statistics.get('high_events', 0)}",
+            f"- Rule Types: {len(report_data.get('security_events', []))}"
+        ]
+        
+        trends = report_data.get('trends', {}).get('analysis', {})
+        if trends:
+            lines.append(
+                f"- Arah Trend: {trends.get('trend_direction', 'stable')} "
+                f"({trends.get('total_events_change', 0):+.1f}%)"
+            )
+        
+        ip_addresses = report_data.get('iocs', {}).get('ip_addresses', [])
+        if ip_addresses:
+            lines.append(f"- IP Addresses: {', '.join(ip_addresses[:MAX_CONTEXT_IOCS])}")
+        
+        return '\n'.join(lines)
+    
+    def _get_cached(self, cache: "OrderedDict[Any, Tuple[float, Dict[str, Any]]]",
+                    key: Any) -> Optional[Dict[str, Any]]:
+        """Return an unexpired cached entry, marking it recently used, or drop it if expired"""
+        with self._cache_lock:
+            entry = cache.get(key)
+            if entry is None:
+                return None
+            
+            expires_at, value = entry
+            if time.monotonic() < expires_at:
+                cache.move_to_end(key)
+                return value
+            
+            del cache[key]
+            return None
+    
+    def _store_cached(self, cache: "OrderedDict[Any, Tuple[float, Dict[str, Any]]]", key: Any,
+                      value: Dict[str, Any], report_type: str, max_size: int) -> None:
+        """Cache value for the report type's TTL, dropping expired and least recently used entries"""
+        now = time.monotonic()
+        with self._cache_lock:
+            # TTLs differ per report type, so expired entries can sit anywhere in the order
+            for expired_key in [k for k, (expires_at, _) in cache.items() if expires_at <= now]:
+                del cache[expired_key]
+            
+            cache[key] = (now + REPORT_CACHE_TTL.get(report_type, DEFAULT_REPORT_CACHE_TTL), value)
+            cache.move_to_end(key)
+            while len(cache) > max_size:
+                cache.popitem(last=False)
+    
     def _prepare_analysis_context(self, report_data: Dict[str, Any], report_type: str) -> str:
         """Prepare context for AI analysis"""
+        statistics = report_data.get('statistics', {})
+        agent_status = report_data.get('agent_status', {})
         context = f"""LAPORAN KEAMANAN {report_type.upper()}
         
 Periode: {report_data.get('period', 'Unknown')}
         
 RINGKASAN STATISTIK:
-- Total Events: {report_data.get('statistics', {}).get('summary', {}).get('total_events', 0)}
-- Agent Aktif: {report_data.get('agent_status', {}).get('active_agents', 0)} dari {report_data.get('agent_status', {}).get('total_agents', 0)}
-- Critical Events (Level 7): {report_data.get('statistics', {}).get('critical_events', 0)}
-- High Events (Level 6): {report_data.get('statistics', {}).get('high_events', 0)}
+- Total Events: {statistics.get('summary', {}).get('total_events', 0)}
+- Agent Aktif: {agent_status.get('active_agents', 0)} dari {agent_status.get('total_agents', 0)}
+- Critical Events (Level 7): {statistics.get('critical_events', 0)}
+- High Events (Level 6): {statistics.get('high_events', 0)}
 
 ALL SECURITY EVENTS (GROUPED BY RULE ID):
 """
         
+        # Parts are collected in a list and joined once instead of growing one string
+        parts = [context]
+        
         # TAMPILKAN SEMUA EVENTS - JANGAN DIBATASI!
         events = report_data.get('security_events', [])  # HAPUS [:10] - TAMPILKAN SEMUA!
         for i, event in enumerate(events, 1):
@@ -449,35 +716,68 @@ ALL SECURITY EVENTS (GROUPED BY RULE ID):
             location = rep_event.get('location', 'N/A')
             timestamp = rep_event.get('timestamp', 'N/A')
             
-            context += f"\n{i}. [Level {event.get('rule_level', 'N/A')}] Rule {event.get('rule_id', 'N/A')}: {event.get('rule_description', 'N/A')}"
-            context += f"\n   - Agent: {agent_name} (ID: {agent_id})"
-            context += f"\n   - Location: {location}"
-            context += f"\n   - Count: {event.get('count', 1)} occurrences"
-            context += f"\n   - Latest: {event.get('latest_occurrence', timestamp)}"
-            
             # TAMBAHKAN RAW JSON DATA LENGKAP UNTUK ANALISIS MENDALAM - JANGAN DIPOTONG!
+            # Kirim JSON lengkap dan full log lengkap ke AI untuk analisis mendalam
             raw_json = event.get('raw_json_sample', '')
-            if raw_json:
-                # Kirim JSON lengkap ke AI untuk analisis mendalam
-                context += f"\n   - Raw JSON Data: {raw_json}"
-            
+            raw_json_line = f"\n   - Raw JSON Data: {raw_json}" if raw_json else ''
             full_log = event.get('full_log_sample', '')
-            if full_log:
-                # Kirim full log lengkap ke AI 
-                context += f"\n   - Full Log: {full_log}"
+            # The ingest server stores json.dumps() of the whole alert, so the full log is
+            # usually already inside the raw JSON; only send it separately when it is not,
+            # which keeps every byte of data while not paying for it twice in the prompt
+            if full_log and not (raw_json and json.dumps(full_log) in raw_json):
+                full_log_line = f"\n   - Full Log: {full_log}"
+            else:
+                full_log_line = ''
             
-            context += "\n"
+            # One append per event
+            parts.append(
+                f"\n{i}. [Level {event.get('rule_level', 'N/A')}] Rule {event.get('rule_id', 'N/A')}: {event.get('rule_description', 'N/A')}"
+                f"\n   - Agent: {agent_name} (ID: {agent_id})"
+                f"\n   - Location: {location}"
+                f"\n   - Count: {event.get('count', 1)} occurrences"
+                f"\n   - Latest: {event.get('latest_occurrence', timestamp)}"
+                f"{raw_json_line}{full_log_line}\n"
+            )
+        
+        # IoCs are extracted deterministically, the model only has to assess them
+        iocs = report_data.get('iocs', {})
+        if any(iocs.values()):
+            parts.append("\n\nINDICATORS OF COMPROMISE (DIEKSTRAK OTOMATIS DARI RAW JSON):\n")
+            for label, key in (('IP Addresses', 'ip_addresses'), ('URLs', 'urls'), ('Hashes', 'hashes')):
+                values = iocs.get(key, [])
+                if values:
+                    parts.append(f"- {label}: {', '.join(values[:MAX_CONTEXT_IOCS])}\n")
         
         # Add trend analysis if available
         if 'trends' in report_data:
             trends = report_data['trends'].get('analysis', {})
-            context += f"\n\nTREND ANALYSIS:\n"
-            context += f"- Perubahan Total Events: {trends.get('total_events_change', 0):.1f}%\n"
-            context += f"- Arah Trend: {trends.get('trend_direction', 'stable')}\n"
+            parts.append(
+                f"\n\nTREND ANALYSIS:\n"
+                f"- Perubahan Total Events: {trends.get('total_events_change', 0):.1f}%\n"
+                f"- Arah Trend: {trends.get('trend_direction', 'stable')}\n"
+            )
+        
+        parts.append("\n\nSilakan berikan analisis mendalam tentang kondisi keamanan berdasarkan data di atas.")
         
-        context += "\n\nSilakan berikan analisis mendalam tentang kondisi keamanan berdasarkan data di atas."
+        return ''.join(parts)
+    
+    def _extract_iocs(self, security_events: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+        """Collect unique IPs, URLs and file hashes from the events' raw JSON in one pass"""
+        ip_addresses, urls, hashes = set(), set(), set()
+        for event in security_events:
+            raw_json = event.get('raw_json_sample') or ''
+            if not raw_json:
+                continue
+            ip_addresses.update(IOC_IP_PATTERN.findall(raw_json))
+            if '://' in raw_json:
+                urls.update(IOC_URL_PATTERN.findall(raw_json))
+            hashes.update(match.lower() for match in IOC_HASH_PATTERN.findall(raw_json))
         
-        return context
+        return {
+            'ip_addresses': sorted(ip_addresses),
+            'urls': sorted(urls),
+            'hashes': sorted(hashes)
+        }
     
     def _calculate_risk_score(self, report_data: Dict[str, Any]) -> int:
         """Calculate risk score (1-10) based on security data"""
@@ -487,28 +787,13 @@ ALL SECURITY EVENTS (GROUPED BY RULE ID):
             high_events = stats.get('high_events', 0)
             total_events = stats.get('summary', {}).get('total_events', 0)
             
-            # Base score calculation
-            base_score = 3
-            
-            # Critical events impact (0-4 points)
-            if critical_events > 10:
-                base_score += 4
-            elif critical_events > 5:
-                base_score += 3
-            elif critical_events > 1:
-                base_score += 2
-            elif critical_events > 0:
-                base_score += 1
-            
-            # High events impact (0-2 points) 
-            if high_events > 20:
-                base_score += 2
-            elif high_events > 5:
-                base_score += 1
-            
-            # Volume impact (0-1 point)
-            if total_events > 1000:
-                base_score += 1
+            # bisect_left counts the thresholds strictly below each value
+            base_score = (
+                BASE_RISK_SCORE
+                + bisect_left(CRITICAL_EVENT_THRESHOLDS, critical_events)
+                + bisect_left(HIGH_EVENT_THRESHOLDS, high_events)
+                + bisect_left(VOLUME_THRESHOLDS, total_events)
+            )
             
             return min(base_score, 10)
             
@@ -517,22 +802,12 @@ ALL SECURITY EVENTS (GROUPED BY RULE ID):
     
     def _get_risk_level(self, risk_score: int) -> str:
         """Convert risk score to risk level"""
-        if risk_score >= 8:
-            return 'Critical'
-        elif risk_score >= 6:
-            return 'High'
-        elif risk_score >= 4:
-            return 'Medium'
-        else:
-            return 'Low'
+        return RISK_LEVELS[min(max(int(risk_score), 0), len(RISK_LEVELS) - 1)]
     
     def _extract_priority_actions(self, ai_analysis: str) -> List[str]:
-        """Extract priority actions from AI analysis"""
-        # First remove think tags
-        clean_analysis = self._remove_thinking_tags(ai_analysis)
-        
+        """Extract priority actions from AI analysis already passed through _remove_thinking_tags"""
         actions = []
-        lines = clean_analysis.split('\n')
+        lines = ai_analysis.split('\n')
         
         # Look for recommendations or action sections
         in_recommendation_section = False
@@ -545,7 +820,7 @@ ALL SECURITY EVENTS (GROUPED BY RULE ID):
                 continue
             
             # Check if we're entering a recommendations section
-            if any(keyword in line.lower() for keyword in ['rekomendasi', 'tindakan', 'action', 'langkah']):
+            if RECOMMENDATION_HEADER_PATTERN.search(line):
                 if len(line) < 100:  # This is likely a header
                     in_recommendation_section = True
                     continue
@@ -553,23 +828,26 @@ ALL SECURITY EVENTS (GROUPED BY RULE ID):
             # If in recommendations section, look for bullet points or numbered items
             if in_recommendation_section:
                 # Look for bullet points or numbered lists
-                if line.startswith(('•', '-', '*', '1.', '2.', '3.', '4.', '5.')):
-                    # Clean and extract the action
-                    clean_action = line
-                    for prefix in ['•', '-', '*', '1.', '2.', '3.', '4.', '5.']:
-                        clean_action = clean_action.lstrip(prefix).strip()
+                bullet = ACTION_BULLET_PATTERN.match(line)
+                if bullet:
+                    # Extract the action text after the marker
+                    clean_action = bullet.group(1)
                     
                     if len(clean_action) > 20 and len(clean_action) < 300:  # Reasonable length
                         actions.append(clean_action)
+                        if len(actions) == MAX_PRIORITY_ACTIONS:
+                            break
                         
                 # Stop if we hit another section header
                 elif line.startswith('**') or line.startswith('#'):
                     break
             
             # Also look for direct action items anywhere in text
-            elif any(keyword in line.lower() for keyword in ['monitor', 'blokir', 'pastikan', 'periksa', 'aktifkan', 'isolasi']):
+            elif ACTION_LINE_PATTERN.search(line):
                 if len(line) > 20 and len(line) < 300:
                     actions.append(line)
+                    if len(actions) == MAX_PRIORITY_ACTIONS:
+                        break
         
         # Default actions if none found or too few
         if len(actions) < 2:
@@ -581,20 +859,22 @@ ALL SECURITY EVENTS (GROUPED BY RULE ID):
                 'Update security measures jika diperlukan'
             ]
         
-        return actions[:5]  # Top 5 actions
+        return actions[:MAX_PRIORITY_ACTIONS]  # Top 5 actions
     
     def _remove_thinking_tags(self, text: str) -> str:
         """Remove thinking tags and any content within them from AI analysis"""
-        import re
-        
-        # Remove <think>...</think> blocks completely
-        clean_text = re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL | re.IGNORECASE)
+        clean_text = text
         
-        # Also remove any standalone <think> or </think> tags
-        clean_text = re.sub(r'</?think>', '', clean_text, flags=re.IGNORECASE)
+        # Tag passes only run when the text can hold a tag at all
+        if '<' in clean_text:
+            # Remove <think>...</think> blocks completely
+            clean_text = THINK_BLOCK_PATTERN.sub('', clean_text)
+            
+            # Also remove any standalone <think> or </think> tags
+            clean_text = THINK_TAG_PATTERN.sub('', clean_text)
         
         # Clean up extra whitespace and newlines
-        clean_text = re.sub(r'\n\s*\n\s*\n', '\n\n', clean_text)  # Remove excessive newlines
+        clean_text = EXCESS_NEWLINES_PATTERN.sub('\n\n', clean_text)  # Remove excessive newlines
         clean_text = clean_text.strip()
         
         return clean_text
@@ -602,9 +882,10 @@ ALL SECURITY EVENTS (GROUPED BY RULE ID):
     # Report generation methods for different types
     async def generate_daily_report(self) -> Dict[str, Any]:
         """Generate daily security report - dari jam 00:00:00 hari ini sampai sekarang"""
+        # Satu kali datetime.now() agar start dan end dari hari yang sama (aman di tengah malam)
         end_time = datetime.now()
         # Start dari jam 00:00:00 hari ini
-        start_time = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        start_time = end_time.replace(hour=0, minute=0, second=0, microsecond=0)
         
         return await self._generate_base_report('daily', start_time, end_time)
     
@@ -612,7 +893,7 @@ ALL SECURITY EVENTS (GROUPED BY RULE ID):
         """Generate 3-day security trend report - 3 hari terakhir lengkap + hari ini"""
         end_time = datetime.now()
         # 3 hari yang lalu jam 00:00 sampai sekarang
-        start_time = (datetime.now() - timedelta(days=3)).replace(hour=0, minute=0, second=0, microsecond=0)
+        start_time = (end_time - timedelta(days=3)).replace(hour=0, minute=0, second=0, microsecond=0)
         
         return await self._generate_base_report('three_daily', start_time, end_time)
     
@@ -635,22 +916,66 @@ ALL SECURITY EVENTS (GROUPED BY RULE ID):
     
     async def _generate_base_report(self, report_type: str, start_time: datetime, end_time: datetime) -> Dict[str, Any]:
         """Generate base report structure for any type"""
+        # Periods start on a fixed boundary (midnight, Monday, 1st of month), so a report
+        # for the same type and start is reused until its TTL expires
+        cache_key = (report_type, start_time)
+        cached_report = self._get_cached(self._report_cache, cache_key)
+        if cached_report is not None:
+            logger.info(f"Reusing cached {report_type} report generated at {cached_report['generated_at']}")
+            return cached_report
+        
+        # Concurrent requests for the same report wait for the one already being generated
+        # instead of running the queries and the LLM again
+        inflight = self._report_inflight.get(cache_key)
+        if inflight is None or inflight.get_loop() is not asyncio.get_running_loop():
+            inflight = asyncio.ensure_future(self._build_report(report_type, start_time, end_time, cache_key))
+            self._report_inflight[cache_key] = inflight
+            
+            def _forget(task):
+                if self._report_inflight.get(cache_key) is task:
+                    del self._report_inflight[cache_key]
+            
+            inflight.add_done_callback(_forget)
+        else:
+            logger.info(f"Waiting for the {report_type} report already being generated")
+        
+        # Shielded so one cancelled caller does not cancel the report for the others
+        return await asyncio.shield(inflight)
+    
+    async def _build_report(self, report_type: str, start_time: datetime, end_time: datetime,
+                            cache_key: Tuple[str, datetime]) -> Dict[str, Any]:
+        """Gather the data and AI analysis for one report and cache it if complete"""
         try:
             logger.info(f"Generating {report_type} report for period {start_time} to {end_time}")
             
-            # Gather all data - ensure all methods return safe defaults
-            security_events = await self.get_security_events(start_time, end_time, report_type) or []
-            agent_status = await self.get_agent_status_summary(start_time, end_time) or {}
-            statistics = await self.get_security_statistics(start_time, end_time) or {}
-            trends = await self.analyze_security_trends(start_time, end_time, 
-                                                      compare_previous=(report_type != 'daily')) or {}
+            # Gather all data concurrently - each query runs in its own thread with its own
+            # connection. The trend analysis shares the current period statistics task, so
+            # only the previous period is scanned again. A failing source falls back to its
+            # empty default without discarding the others
+            statistics_task = asyncio.ensure_future(self.get_security_statistics(start_time, end_time))
+            results = await asyncio.gather(
+                self.get_security_events(start_time, end_time, report_type),
+                self.get_agent_status_summary(start_time, end_time),
+                statistics_task,
+                self.analyze_security_trends(start_time, end_time,
+                                             compare_previous=(report_type != 'daily'),
+                                             current_stats=statistics_task),
+                return_exceptions=True
+            )
+            partial_errors = []
+            security_events, agent_status, statistics, trends = (
+                self._source_result(source, result, default, partial_errors)
+                for source, result, default in zip(REPORT_SOURCES, results, ([], {}, {}, {}))
+            )
             
             # Compile base report data
-            report_config = getattr(self.config, 'REPORT_TYPES', {}).get(report_type, {
-                'name': f'{report_type.title()} Report',
-                'emoji': '📊',
-                'description': f'Security report for {report_type}'
-            })
+            report_config = self._report_configs.get(report_type)
+            if report_config is None:
+                report_config = {
+                    'name': f'{report_type.title()} Report',
+                    'emoji': '📊',
+                    'description': f'Security report for {report_type}'
+                }
             
             report_data = {
                 'report_type': report_type,
@@ -659,16 +984,24 @@ ALL SECURITY EVENTS (GROUPED BY RULE ID):
                 'period_start': start_time.isoformat(),
                 'period_end': end_time.isoformat(),
                 'security_events': security_events,
+                'iocs': self._extract_iocs(security_events),
                 'agent_status': agent_status,
                 'statistics': statistics,
                 'trends': trends,
                 'generated_at': datetime.now().isoformat()
             }
+            if partial_errors:
+                # Sources that failed and were replaced by empty defaults
+                report_data['partial_errors'] = partial_errors
             
             # Generate AI analysis
             ai_analysis = await self.generate_ai_analysis(report_data, report_type)
             report_data['ai_analysis'] = ai_analysis
             
+            # Only complete reports are cached; after a source or LLM failure the next request retries
+            if not partial_errors and ai_analysis.get('ai_generated'):
+                self._store_cached(self._report_cache, cache_key, report_data, report_type, REPORT_CACHE_SIZE)
+            
             logger.info(f"✅ {report_type} report generated successfully with {len(security_events)} events")
             return report_data
             
@@ -682,11 +1015,31 @@ ALL SECURITY EVENTS (GROUPED BY RULE ID):
 
 # Initialize report generator
 report_generator = None
+# The webapp calls get_report_generator from several threads, each with its own event loop
+# (asyncio.run per request), so the instance is published under a thread lock and first
+# callers on the same loop wait on that loop's own asyncio lock
+_report_generator_lock = threading.Lock()
+_report_generator_loop_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
 
 async def get_report_generator():
     """Get initialized report generator instance"""
     global report_generator
-    if report_generator is None:
-        report_generator = SecurityReportGenerator()
-        await report_generator.initialize()
+    if report_generator is not None:
+        return report_generator
+    
+    loop = asyncio.get_running_loop()
+    with _report_generator_lock:
+        init_lock = _report_generator_loop_locks.get(loop)
+        if init_lock is None:
+            init_lock = _report_generator_loop_locks[loop] = asyncio.Lock()
+    
+    async with init_lock:
+        if report_generator is None:
+            generator = SecurityReportGenerator()
+            await generator.initialize()
+            # Published only once initialized, so no caller sees a half-ready instance;
+            # if another thread's loop finished first, its instance is kept
+            with _report_generator_lock:
+                if report_generator is None:
+                    report_generator = generator
     return report_generator
@@ -27,16 +27,20 @@ import asyncio
 import logging
 import json
 import os
+import re
 import threading
 import time
 import sqlite3
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional
 from pathlib import Path
 
-# Add config directory to path
+# Add project root to path for config and project modules (once, so reimports don't grow sys.path)
 project_root = Path(__file__).parent.parent.parent
-sys.path.append(str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 from config.config_manager import ConfigManager
 config = ConfigManager()
 
@@ -46,16 +50,10 @@ from telegram.ext import (
     MessageHandler, filters, ContextTypes
 )
 
-# Add parent directories to path for importing project modules
-current_dir = Path(__file__).parent
-project_root = current_dir.parent.parent
-sys.path.insert(0, str(project_root))
-sys.path.insert(0, str(project_root / 'src'))
-
 # Import project components
 from src.database import ChatDatabase
 from src.api import FastMCPBridge
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 # Import webapp chatbot components for consistency
 from src.webapp.webapp_chatbot import ChatSession, process_chat_message
@@ -69,9 +67,120 @@ from src.telegram.telegram_pdf_generator import PDFReportGenerator
 
 logger = logging.getLogger(__name__)
 
+# Minimum rule level that triggers a realtime alert
+ALERT_MIN_RULE_LEVEL = 5
+# Latest qualifying events sent on the first check after alerts are (re)enabled
+ALERT_INITIAL_EVENTS = 5
+# Most events read per check; a larger backlog is picked up by the following checks
+ALERT_BATCH_LIMIT = 500
+
+# Alert messages sent concurrently per second, kept under Telegram's 30 msg/s bot limit
+ALERT_SEND_RATE = 25
+
+# One-off job that delivers queued alerts, separate from the periodic check
+ALERT_FLUSH_JOB = "alert_flush"
+
+# Alerts are tracked by an id watermark: ids only grow, so every row above the last id
+# sent is new, and the primary key lets SQLite start reading right after it
+ALERT_WATERMARK_QUERY = f"""
+    SELECT id FROM wazuh_archives
+    WHERE rule_level >= {ALERT_MIN_RULE_LEVEL}
+    ORDER BY id DESC
+    LIMIT 1 OFFSET {ALERT_INITIAL_EVENTS}
+"""
+NEW_ALERTS_QUERY = f"""
+    SELECT id, timestamp, COALESCE(agent_name, 'Unknown') AS agent_name, rule_id, rule_level,
+           rule_description, location, full_log
+    FROM wazuh_archives
+    WHERE id > ? AND rule_level >= {ALERT_MIN_RULE_LEVEL}
+    ORDER BY id
+    LIMIT {ALERT_BATCH_LIMIT}
+"""
+
+# Chat sessions kept in memory, least recently used dropped first
+CHAT_SESSION_MAX = 1000
+# Chat sessions idle longer than this (seconds) are dropped and start fresh
+CHAT_SESSION_IDLE_TTL = 60 * 60
+
+# Recent user turns (with their replies and tool results) sent to the LLM besides the system prompt
+CHAT_HISTORY_TURNS = 4
+# Older user questions summarised in a memory note once they fall out of the history window
+MEMORY_NOTE_QUESTIONS = 5
+MEMORY_NOTE_QUESTION_CHARS = 200
+# Longest tool result (characters of JSON) put into the prompt; the rest is cut off
+TOOL_RESULT_MAX_CHARS = 8000
+
+# Telegram message length limit
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Reply cleanup patterns, compiled once instead of on every LLM reply
+THINK_BLOCK_PATTERN = re.compile(r'<think>.*?</think>', re.DOTALL | re.IGNORECASE)
+THINK_TAG_PATTERN = re.compile(r'</?think>', re.IGNORECASE)
+EXCESS_NEWLINES_PATTERN = re.compile(r'\n\s*\n\s*\n')
+MARKDOWN_BOLD_PATTERN = re.compile(r'\*\*([^*]+)\*\*')
+MARKDOWN_ITALIC_PATTERN = re.compile(r'\*([^*]+)\*')
+MARKDOWN_CODE_PATTERN = re.compile(r'`([^`]+)`')
+MARKDOWN_HEADER_PATTERN = re.compile(r'#{1,6}\s*')
+MARKDOWN_LINK_PATTERN = re.compile(r'\[([^\]]+)\]\([^)]+\)')
+# Characters that break Telegram Markdown parsing and their safe replacements
+MARKDOWN_SAFE_TABLE = str.maketrans({
+    '`': "'",  # Replace backticks with single quotes
+    '*': '•',  # Replace asterisks with bullets
+    '_': '-',  # Replace underscores with dashes
+    '[': '(',  # Replace square brackets
+    ']': ')',
+    '#': '➤',  # Replace hash symbols
+})
+
 class TelegramSecurityBot:
     """Main Telegram bot class for security reporting and Q&A"""
     
+    # Menus and the welcome text are the same for every user, so they are built once
+    MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton("📊 Daily Report", callback_data='report_daily'),
+            InlineKeyboardButton("📈 3-Day Report", callback_data='report_3day')
+        ],
+        [
+            InlineKeyboardButton("📋 Weekly Report", callback_data='report_weekly'),
+            InlineKeyboardButton("📅 Monthly Report", callback_data='report_monthly')
+        ],
+        [
+            InlineKeyboardButton("🚨 Enable Alerts", callback_data='enable_alerts'),
+            InlineKeyboardButton("🔕 Disable Alerts", callback_data='disable_alerts')
+        ],
+        [
+            InlineKeyboardButton("❓ Ask Security Question", callback_data='mode_question'),
+            InlineKeyboardButton("📊 System Status", callback_data='system_status')
+        ],
+        [
+            InlineKeyboardButton("⚙️ Settings", callback_data='settings'),
+            InlineKeyboardButton("📖 Help", callback_data='help')
+        ]
+    ])
+    
+    SETTINGS_MENU_MARKUP = InlineKeyboardMarkup([
+        [InlineKeyboardButton("🔄 Refresh Status", callback_data='system_status')],
+        [InlineKeyboardButton("📊 Database Stats", callback_data='db_stats')],
+        [InlineKeyboardButton("🔙 Back to Main Menu", callback_data='back_main')]
+    ])
+    
+    WELCOME_TEMPLATE = """
+🔒 **Security Monitoring Bot**
+
+Selamat datang {first_name}!
+
+Saya adalah bot untuk monitoring keamanan sistem Wazuh. Saya dapat:
+
+• 📊 Generate laporan keamanan (harian, 3-hari, mingguan, bulanan)
+• 🚨 Mengirim alert realtime untuk event critical (level 7+)
+• 🤖 Menjawab pertanyaan tentang data keamanan menggunakan AI
+• 📄 Membuat laporan PDF yang detail
+• 🔍 Melakukan analisis mendalam dengan RAG system
+
+Pilih menu di bawah untuk memulai:
+        """
+    
     def __init__(self):
         self.config = TelegramBotConfig()
         
@@ -95,7 +204,8 @@ class TelegramSecurityBot:
         # Initialize existing components (same as webapp)
         self.chat_db = ChatDatabase()
         self.mcp_bridge = FastMCPBridge()
-        self.llm_client = OpenAI(
+        # Async client: replies are awaited on the bot's event loop over one pooled connection set
+        self.llm_client = AsyncOpenAI(
             base_url=self.config.LM_STUDIO_CONFIG['base_url'],
             api_key=self.config.LM_STUDIO_CONFIG['api_key'],
             timeout=None  # No timeout
@@ -107,14 +217,34 @@ class TelegramSecurityBot:
         
         # Bot state
         self.application = None
-        self.chat_sessions = {}  # Store chat sessions per user
+        # Store chat sessions per user, least recently used first
+        self.chat_sessions: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        # Per-user locks, since updates from different users are handled concurrently
+        self._user_locks: Dict[int, asyncio.Lock] = {}
+        # Handlers holding or waiting for each user's lock; the lock is dropped when it reaches 0
+        self._user_lock_users: Dict[int, int] = {}
+        # Inline keyboard callbacks with a fixed callback_data; report_* is routed by prefix
+        self._callback_routes = {
+            'enable_alerts': self.handle_enable_alerts,
+            'disable_alerts': self.handle_disable_alerts,
+            'mode_question': self.handle_question_mode,
+            'system_status': self.handle_system_status,
+            'settings': self.handle_settings,
+            'help': self.handle_help,
+        }
         
         # Realtime alert system
         self.alert_subscribers = set()  # Users subscribed to alerts
         self.alert_running = False
-        self.last_alert_check = datetime.now()
-        self.sent_alert_ids = set()  # Track sent alert IDs to prevent duplicates
-        self.pending_alerts = []  # Store alerts to be sent
+        # Wall-clock time of the last alert check; only formatted when a status is shown
+        self.last_alert_check = time.time()
+        # Highest archive id already alerted on; None until the first check
+        self._last_alert_id: Optional[int] = None
+        # Alert checks reuse one archive connection, used by one worker thread at a time
+        self._alert_conn: Optional[sqlite3.Connection] = None
+        self._alert_conn_lock = threading.Lock()
+        self.pending_alerts = []  # Store alerts to be sent, newest first
+        self._alert_flush_scheduled = False
     
     async def initialize(self):
         """Initialize all bot components"""
@@ -153,50 +283,11 @@ class TelegramSecurityBot:
             )
             return
         
-        keyboard = [
-            [
-                InlineKeyboardButton("📊 Daily Report", callback_data='report_daily'),
-                InlineKeyboardButton("📈 3-Day Report", callback_data='report_3day')
-            ],
-            [
-                InlineKeyboardButton("📋 Weekly Report", callback_data='report_weekly'),
-                InlineKeyboardButton("📅 Monthly Report", callback_data='report_monthly')
-            ],
-            [
-                InlineKeyboardButton("🚨 Enable Alerts", callback_data='enable_alerts'),
-                InlineKeyboardButton("🔕 Disable Alerts", callback_data='disable_alerts')
-            ],
-            [
-                InlineKeyboardButton("❓ Ask Security Question", callback_data='mode_question'),
-                InlineKeyboardButton("📊 System Status", callback_data='system_status')
-            ],
-            [
-                InlineKeyboardButton("⚙️ Settings", callback_data='settings'),
-                InlineKeyboardButton("📖 Help", callback_data='help')
-            ]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        welcome_text = f"""
-🔒 **Security Monitoring Bot**
-
-Selamat datang {user.first_name}!
-
-Saya adalah bot untuk monitoring keamanan sistem Wazuh. Saya dapat:
-
-• 📊 Generate laporan keamanan (harian, 3-hari, mingguan, bulanan)
-• 🚨 Mengirim alert realtime untuk event critical (level 7+)
-• 🤖 Menjawab pertanyaan tentang data keamanan menggunakan AI
-• 📄 Membuat laporan PDF yang detail
-• 🔍 Melakukan analisis mendalam dengan RAG system
-
-Pilih menu di bawah untuk memulai:
-        """
+        welcome_text = self.WELCOME_TEMPLATE.format(first_name=user.first_name)
         
         await update.message.reply_text(
             welcome_text,
-            reply_markup=reply_markup,
+            reply_markup=self.MAIN_MENU_MARKUP,
             parse_mode='Markdown'
         )
     
@@ -214,19 +305,14 @@ Pilih menu di bawah untuk memulai:
         
         # Route to appropriate handler
         if data.startswith('report_'):
-            await self.handle_report_request(update, context, data)
-        elif data == 'enable_alerts':
-            await self.handle_enable_alerts(update, context)
-        elif data == 'disable_alerts':
-            await self.handle_disable_alerts(update, context)
-        elif data == 'mode_question':
-            await self.handle_question_mode(update, context)
-        elif data == 'system_status':
-            await self.handle_system_status(update, context)
-        elif data == 'settings':
-            await self.handle_settings(update, context)
-        elif data == 'help':
-            await self.handle_help(update, context)
+            # Repeated taps by the same user wait for the report already in progress
+            async with self._user_lock(user_id):
+                await self.handle_report_request(update, context, data)
+            return
+        
+        handler = self._callback_routes.get(data)
+        if handler:
+            await handler(update, context)
         else:
             await query.edit_message_text("❓ Unknown command")
     
@@ -311,13 +397,7 @@ Pilih menu di bawah untuk memulai:
         
         # Set user to question mode
         user_id = update.effective_user.id
-        if user_id not in self.chat_sessions:
-            self.chat_sessions[user_id] = {
-                'mode': 'question',
-                'session_id': self.chat_db.create_session(f"Telegram_{user_id}_{int(time.time())}")
-            }
-        else:
-            self.chat_sessions[user_id]['mode'] = 'question'
+        self._get_chat_entry(user_id)['mode'] = 'question'
         
         await query.edit_message_text(
             "🤖 **Question Mode Activated**\n\n"
@@ -370,7 +450,7 @@ Pilih menu di bawah untuk memulai:
         if not self.alert_subscribers and self.alert_running:
             self.stop_alert_monitoring()
             # Reset sent alert tracking when monitoring stops
-            self.sent_alert_ids.clear()
+            self._last_alert_id = None
             logger.info("🔄 Alert tracking reset - all alerts can be sent again when monitoring restarts")
         
         await query.edit_message_text(
@@ -392,72 +472,111 @@ Pilih menu di bawah untuk memulai:
             await update.message.reply_text("❌ Unauthorized access")
             return
         
-        # Check if user is in question mode - auto activate untuk semua message
-        if user_id not in self.chat_sessions:
-            session_id = self.chat_db.create_session(f"Telegram_{user_id}_{int(time.time())}")
-            # Use SAME ChatSession class as webapp chatbot
-            chat_session = ChatSession(session_id)
-            self.chat_sessions[user_id] = {
-                'mode': 'question',
-                'session_id': session_id,
-                'chat_session': chat_session  # Add actual ChatSession object
-            }
-        
-        chat_session = self.chat_sessions[user_id]['chat_session']
-        session_id = self.chat_sessions[user_id]['session_id']
-        
-        # Initialize tools if not already done (SAME as webapp)
-        await chat_session.initialize_tools()
-        
-        # Add user message to session (SAME as webapp)
-        chat_session.add_message("user", user_question)
-        
-        # Show typing indicator
-        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
-        
-        try:
-            # === USE MODIFIED PROCESS FOR TELEGRAM BOT (ASYNC COMPATIBLE) ===
-            
-            logger.info(f"=== PROCESSING MESSAGE FOR SESSION {session_id} ===")
-            logger.info(f"Using MODIFIED async-compatible system for Telegram bot")
-            
-            # Call our async-compatible version instead of webapp function
-            result = await self.process_chat_message_async(chat_session, session_id)
-            
-            if "error" in result:
-                error_message = f"❌ Error processing question: {result['error']}"
-                await update.message.reply_text(error_message)
-                logger.error(f"Chat processing error: {result['error']}")
-                return
+        # One question at a time per user: updates are processed concurrently, but a
+        # chat session must see its messages in order
+        async with self._user_lock(user_id):
+            # Check if user is in question mode - auto activate untuk semua message
+            chat_entry = self._get_chat_entry(user_id)
+            chat_session = chat_entry['chat_session']
+            session_id = chat_entry['session_id']
             
-            # Get the response content (webapp returns "response" key, not "content")
-            response_content = result.get("response", "Maaf, tidak ada response yang dihasilkan.")
+            # Initialize tools if not already done (SAME as webapp)
+            await chat_session.initialize_tools()
             
-            # Clean response for Telegram (remove think tags, etc.)
-            response_content = self._remove_think_tags(response_content)
-            response_content = self._clean_markdown(response_content)
+            # Add user message to session (SAME as webapp)
+            chat_session.add_message("user", user_question)
             
-            # NOTE: No need to save to database again - process_chat_message already saved it
+            # Show typing indicator
+            await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
             
-            # Split long responses for Telegram
-            max_length = 4096  # Telegram message limit
-            if len(response_content) > max_length:
-                parts = [response_content[i:i+max_length] for i in range(0, len(response_content), max_length)]
-                for part in parts:
+            try:
+                # === USE MODIFIED PROCESS FOR TELEGRAM BOT (ASYNC COMPATIBLE) ===
+                
+                logger.info(f"=== PROCESSING MESSAGE FOR SESSION {session_id} ===")
+                logger.info(f"Using MODIFIED async-compatible system for Telegram bot")
+                
+                # Call our async-compatible version instead of webapp function
+                result = await self.process_chat_message_async(chat_session, session_id)
+                
+                if "error" in result:
+                    error_message = f"❌ Error processing question: {result['error']}"
+                    await update.message.reply_text(error_message)
+                    logger.error(f"Chat processing error: {result['error']}")
+                    return
+                
+                # Get the response content (webapp returns "response" key, not "content")
+                response_content = result.get("response", "Maaf, tidak ada response yang dihasilkan.")
+                
+                # Clean response for Telegram (remove think tags, etc.)
+                response_content = self._remove_think_tags(response_content)
+                response_content = self._clean_markdown(response_content)
+                
+                # NOTE: No need to save to database again - process_chat_message already saved it
+                
+                # Split long responses for Telegram
+                for part in self._split_message(response_content):
                     await update.message.reply_text(part, parse_mode='Markdown')
+                
+                logger.info("Response sent successfully to Telegram")
+                logger.info(f"Chat processing complete. Response length: {len(response_content)} characters")
+                logger.info(f"✅ Question answered for user {user_id}")
+                
+            except Exception as e:
+                logger.error(f"Error processing question from user {user_id}: {e}")
+                await update.message.reply_text(
+                    f"❌ Error processing question: {str(e)}\n\n"
+                    "Please try again or contact administrator."
+                )
+    
+    @asynccontextmanager
+    async def _user_lock(self, user_id: int):
+        """Hold the lock serialising one user's questions and report requests"""
+        lock = self._user_locks.get(user_id)
+        if lock is None:
+            lock = self._user_locks[user_id] = asyncio.Lock()
+        # Counted before waiting, so a lock with queued handlers is never dropped
+        # (asyncio.Lock reports unlocked between release and the next waiter waking up)
+        self._user_lock_users[user_id] = self._user_lock_users.get(user_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            remaining = self._user_lock_users[user_id] - 1
+            if remaining:
+                self._user_lock_users[user_id] = remaining
             else:
-                await update.message.reply_text(response_content, parse_mode='Markdown')
-            
-            logger.info("Response sent successfully to Telegram")
-            logger.info(f"Chat processing complete. Response length: {len(response_content)} characters")
-            logger.info(f"✅ Question answered for user {user_id}")
-            
-        except Exception as e:
-            logger.error(f"Error processing question from user {user_id}: {e}")
-            await update.message.reply_text(
-                f"❌ Error processing question: {str(e)}\n\n"
-                "Please try again or contact administrator."
-            )
+                # Nobody holds or waits on it any more, so only active users keep a lock
+                del self._user_lock_users[user_id]
+                del self._user_locks[user_id]
+    
+    def _get_chat_entry(self, user_id: int) -> Dict[str, Any]:
+        """Return the user's chat session entry, creating it if missing or expired"""
+        sessions = self.chat_sessions
+        now = time.monotonic()
+        
+        # Entries are ordered by last use, so expired ones are all at the front
+        while sessions:
+            oldest = next(iter(sessions.values()))
+            if now - oldest['last_active'] <= CHAT_SESSION_IDLE_TTL:
+                break
+            sessions.popitem(last=False)
+        
+        entry = sessions.get(user_id)
+        if entry is None:
+            if len(sessions) >= CHAT_SESSION_MAX:
+                sessions.popitem(last=False)
+            session_id = self.chat_db.create_session(f"Telegram_{user_id}_{int(time.time())}")
+            entry = sessions[user_id] = {
+                'mode': 'question',
+                'session_id': session_id,
+                # Use SAME ChatSession class as webapp chatbot
+                'chat_session': ChatSession(session_id)
+            }
+        else:
+            sessions.move_to_end(user_id)
+        
+        entry['last_active'] = now
+        return entry
     
     async def handle_system_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle system status check - only MCP"""
@@ -482,7 +601,7 @@ Pilih menu di bawah untuk memulai:
 **🚨 Alert System:**
 • Alert Monitoring: {'🟢 Active' if self.alert_running else '🔴 Stopped'}
 • Total Subscribers: {len(self.alert_subscribers)}
-• Last Alert Check: {self.last_alert_check.strftime('%d/%m/%Y %H:%M:%S')}
+• Last Alert Check: {datetime.fromtimestamp(self.last_alert_check).strftime('%d/%m/%Y %H:%M:%S')}
 
 **Configuration:**
 • Model: {self.config.LM_STUDIO_CONFIG['model']}
@@ -504,14 +623,6 @@ Pilih menu di bawah untuk memulai:
         """Handle settings menu"""
         query = update.callback_query
         
-        keyboard = [
-            [InlineKeyboardButton("🔄 Refresh Status", callback_data='system_status')],
-            [InlineKeyboardButton("📊 Database Stats", callback_data='db_stats')],
-            [InlineKeyboardButton("🔙 Back to Main Menu", callback_data='back_main')]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
         settings_text = """
 ⚙️ **Settings & Configuration**
 
@@ -526,7 +637,7 @@ Pilih menu di bawah untuk memulai:
 • Question Mode: Available
         """
         
-        await query.edit_message_text(settings_text, reply_markup=reply_markup, parse_mode='Markdown')
+        await query.edit_message_text(settings_text, reply_markup=self.SETTINGS_MENU_MARKUP, parse_mode='Markdown')
     
     async def handle_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle help command"""
@@ -644,7 +755,7 @@ Contact your system administrator for technical support.
                 first=3,      # Start after 3 seconds
                 name="realtime_alert_monitoring"
             )
-            logger.info("🚨 AGGRESSIVE realtime alert monitoring started (10s interval, rule level 5+, LATEST 5 ROWS ONLY)")
+            logger.info("🚨 AGGRESSIVE realtime alert monitoring started (10s interval, rule level 5+, all new events)")
         else:
             logger.warning("⚠️ Job queue not available, alert monitoring not started")
     
@@ -667,110 +778,127 @@ Contact your system administrator for technical support.
                 return
             
             # Check for new critical events
-            new_alerts = self.check_for_critical_events()
+            new_alerts = await self.check_for_critical_events()
             
             if new_alerts:
-                # Send alerts to all subscribers
-                await self.send_alerts_to_subscribers(new_alerts)
+                # Queue alerts and hand delivery to a separate job so slow sends never
+                # delay the next check; ticks queued before it runs share one message
+                self.pending_alerts = new_alerts + self.pending_alerts
+                if not self._alert_flush_scheduled:
+                    context.job_queue.run_once(self._flush_pending_alerts, when=0, name=ALERT_FLUSH_JOB)
+                    self._alert_flush_scheduled = True
                 
         except Exception as e:
             logger.error(f"Error in alert checking job: {e}")
     
-    def check_for_critical_events(self) -> List[Dict[str, Any]]:
-        """Check database for new critical events (rule level 5+) - REALTIME with duplicate prevention"""
+    async def _flush_pending_alerts(self, context: ContextTypes.DEFAULT_TYPE):
+        """Send every queued alert to all subscribers (runs as one-off job)"""
         try:
-            # Connect to Wazuh archives database
-            conn = sqlite3.connect(self.wazuh_db_path)
+            while self.pending_alerts:
+                alerts, self.pending_alerts = self.pending_alerts, []
+                await self.send_alerts_to_subscribers(alerts)
+        finally:
+            self._alert_flush_scheduled = False
+    
+    async def check_for_critical_events(self) -> List[sqlite3.Row]:
+        """Check database for new critical events (rule level 5+) - REALTIME with duplicate prevention"""
+        self.last_alert_check = time.time()
+        # The query runs in a worker thread so the 10-second checks never stall Telegram updates
+        return await asyncio.to_thread(self._check_for_critical_events_sync)
+    
+    def _get_alert_db_connection(self) -> sqlite3.Connection:
+        """Get the archive connection used by alert checks, opening it on first use"""
+        if self._alert_conn is None:
+            conn = sqlite3.connect(self.wazuh_db_path, check_same_thread=False)
             conn.row_factory = sqlite3.Row  # Enable column access by name
-            cursor = conn.cursor()
-            
-            # Get ONLY LATEST 5 events with rule level >= 5 (REALTIME ONLY)
-            # Use ID-based tracking instead of timestamp to prevent duplicates
-            cursor.execute("""
-                SELECT * FROM wazuh_archives 
-                WHERE rule_level >= 5
-                ORDER BY timestamp DESC, id DESC
-                LIMIT 5
-            """)
-            
-            events = cursor.fetchall()
-            conn.close()
-            
-            if events:
-                # Filter out already sent alerts
-                new_events = []
-                for event in events:
-                    event_id = event['id']
-                    if event_id not in self.sent_alert_ids:
-                        # Add to sent alerts tracking
-                        self.sent_alert_ids.add(event_id)
-                        
-                        new_events.append({
-                            'id': event['id'],
-                            'timestamp': event['timestamp'],
-                            'agent_name': event['agent_name'] or 'Unknown',
-                            'rule_id': event['rule_id'],
-                            'rule_level': event['rule_level'],
-                            'rule_description': event['rule_description'],
-                            'location': event['location'],
-                            'full_log': event['full_log']
-                        })
+            # Alert checks only read the archive; the ingest server owns all writes
+            conn.execute('PRAGMA query_only=ON')
+            self._alert_conn = conn
+        return self._alert_conn
+    
+    def _check_for_critical_events_sync(self) -> List[sqlite3.Row]:
+        """Blocking part of check_for_critical_events, run in a worker thread"""
+        try:
+            with self._alert_conn_lock:
+                # Connect to Wazuh archives database (persistent, opened once)
+                conn = self._get_alert_db_connection()
                 
-                # Clean up sent_alert_ids to prevent memory issues (keep only last 1000)
-                if len(self.sent_alert_ids) > 1000:
-                    # Keep only the most recent 500 IDs
-                    recent_ids = sorted(list(self.sent_alert_ids))[-500:]
-                    self.sent_alert_ids = set(recent_ids)
+                # Start just below the latest events so they are sent on the first check
+                if self._last_alert_id is None:
+                    row = conn.execute(ALERT_WATERMARK_QUERY).fetchone()
+                    self._last_alert_id = row['id'] if row else 0
                 
-                if new_events:
-                    logger.info(f"🚨 Found {len(new_events)} NEW UNIQUE events (rule level 5+, duplicates filtered)")
-                    return new_events
-                else:
-                    logger.debug("No new unique events found (all events already sent)")
+                # Every event with rule level >= 5 above the watermark is new, so nothing
+                # is dropped during bursts and no sent-id set has to be kept
+                events = conn.execute(NEW_ALERTS_QUERY, (self._last_alert_id,)).fetchall()
+                if not events:
+                    logger.debug("No new events found (all events already sent)")
                     return []
+                self._last_alert_id = events[-1]['id']
             
-            return []
+            # Newest first, as the alert message lists the latest events; the rows are
+            # used as they are, since sqlite3.Row already supports event['column']
+            new_events = events[::-1]
+            
+            logger.info(f"🚨 Found {len(new_events)} NEW UNIQUE events (rule level 5+, duplicates filtered)")
+            return new_events
             
         except Exception as e:
             logger.error(f"Error checking for critical events: {e}")
             return []
     
-    async def send_alerts_to_subscribers(self, alerts: List[Dict[str, Any]]):
+    async def send_alerts_to_subscribers(self, alerts: List[sqlite3.Row]):
         """Send alert notifications to all subscribers"""
         if not self.alert_subscribers or not alerts:
             return
         
         try:
-            # Group alerts by severity
-            critical_alerts = [a for a in alerts if a['rule_level'] >= 8]
-            high_alerts = [a for a in alerts if a['rule_level'] >= 6 and a['rule_level'] < 8]
-            medium_alerts = [a for a in alerts if a['rule_level'] == 5]
+            # Group alerts by severity in a single pass
+            critical_alerts, high_alerts, medium_alerts = [], [], []
+            for alert in alerts:
+                level = alert['rule_level']
+                if level >= 8:
+                    critical_alerts.append(alert)
+                elif level >= 6:
+                    high_alerts.append(alert)
+                elif level == 5:
+                    medium_alerts.append(alert)
             
-            # Create alert message
+            # Create alert message once and broadcast the same text to every subscriber
             alert_message = self._create_alert_message(critical_alerts, high_alerts, medium_alerts)
             
-            # Send to all subscribers with Markdown formatting
-            for user_id in self.alert_subscribers.copy():  # Copy to avoid modification during iteration
-                try:
-                    await self.application.bot.send_message(
-                        chat_id=user_id,
-                        text=alert_message,
-                        parse_mode='Markdown',  # Enable Markdown formatting for code blocks
-                        disable_web_page_preview=True  # Disable preview for cleaner look
-                    )
-                    logger.info(f"✅ Alert sent to user {user_id} with full log details")
-                
-                except Exception as e:
-                    logger.error(f"❌ Failed to send alert to user {user_id}: {e}")
-                    # Remove user if they blocked the bot
-                    if "bot was blocked by the user" in str(e).lower():
-                        self.alert_subscribers.discard(user_id)
-                        logger.info(f"🚫 Removed blocked user {user_id} from alert subscribers")
+            # Send to all subscribers concurrently, one batch per second to respect the API rate limit
+            subscribers = list(self.alert_subscribers)  # Copy to avoid modification during iteration
+            for start in range(0, len(subscribers), ALERT_SEND_RATE):
+                if start:
+                    await asyncio.sleep(1)
+                await asyncio.gather(*(
+                    self._send_alert_to_subscriber(user_id, alert_message)
+                    for user_id in subscribers[start:start + ALERT_SEND_RATE]
+                ))
         
         except Exception as e:
             logger.error(f"Error sending alerts to subscribers: {e}")
     
-    def _create_alert_message(self, critical_alerts: List[Dict], high_alerts: List[Dict], medium_alerts: List[Dict]) -> str:
+    async def _send_alert_to_subscriber(self, user_id: int, alert_message: str):
+        """Send one alert message, dropping the subscriber if they blocked the bot"""
+        try:
+            await self.application.bot.send_message(
+                chat_id=user_id,
+                text=alert_message,
+                parse_mode='Markdown',  # Enable Markdown formatting for code blocks
+                disable_web_page_preview=True  # Disable preview for cleaner look
+            )
+            logger.info(f"✅ Alert sent to user {user_id} with full log details")
+        
+        except Exception as e:
+            logger.error(f"❌ Failed to send alert to user {user_id}: {e}")
+            # Remove user if they blocked the bot
+            if "bot was blocked by the user" in str(e).lower():
+                self.alert_subscribers.discard(user_id)
+                logger.info(f"🚫 Removed blocked user {user_id} from alert subscribers")
+    
+    def _create_alert_message(self, critical_alerts: List[sqlite3.Row], high_alerts: List[sqlite3.Row], medium_alerts: List[sqlite3.Row]) -> str:
         """Create formatted alert message for rule level 5+ WITH FULL LOG DETAILS"""
         timestamp = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
         
@@ -793,7 +921,7 @@ Contact your system administrator for technical support.
                 ])
                 
                 # Add full_log as code block
-                full_log = alert.get('full_log', '').strip()
+                full_log = (alert['full_log'] or '').strip()
                 if full_log:
                     # Truncate very long logs to prevent message size limits
                     if len(full_log) > 800:
@@ -828,7 +956,7 @@ Contact your system administrator for technical support.
                 ])
                 
                 # Add full_log as code block
-                full_log = alert.get('full_log', '').strip()
+                full_log = (alert['full_log'] or '').strip()
                 if full_log:
                     # Truncate very long logs
                     if len(full_log) > 600:
@@ -944,7 +1072,7 @@ Contact your system administrator for technical support.
 Your Status: {'🟢 Subscribed' if user_subscribed else '🔴 Not Subscribed'}
 Alert Monitoring: {'🟢 Active' if self.alert_running else '🔴 Stopped'}
 Total Subscribers: {len(self.alert_subscribers)}
-Last Check: {self.last_alert_check.strftime('%d/%m/%Y %H:%M:%S')}
+Last Check: {datetime.fromtimestamp(self.last_alert_check).strftime('%d/%m/%Y %H:%M:%S')}
 
 Alert Criteria:
 • Rule Level 5+ (Medium, High, Critical)
@@ -986,6 +1114,7 @@ Commands:
                               .write_timeout(None)  # No write timeout
                               .connect_timeout(None)  # No connect timeout
                               .pool_timeout(None)  # No pool timeout
+                              .concurrent_updates(True)  # Slow reports don't block other users
                               .build())
             
             # Add handlers
@@ -1043,6 +1172,8 @@ Commands:
                         alert_task.cancel()
                     await self.application.updater.stop()
                     await self.application.stop()
+                    await self.llm_client.close()
+                    self.pdf_generator.shutdown()
             
         except Exception as e:
             logger.error(f"❌ Error running bot: {e}")
@@ -1056,7 +1187,7 @@ Commands:
             while self.alert_subscribers:  # Keep running while there are subscribers
                 try:
                     # Check for new critical events
-                    alerts = self.check_for_critical_events()
+                    alerts = await self.check_for_critical_events()
                     
                     if alerts:
                         await self.send_alerts_to_subscribers(alerts)
@@ -1077,16 +1208,16 @@ Commands:
     
     def _remove_think_tags(self, text: str) -> str:
         """Remove <think> tags and their content from LLM response - AGGRESSIVE VERSION"""
-        import re
-        
         if not text:
             return text
         
-        # Remove <think>...</think> blocks (case insensitive, multiline, greedy)
-        text = re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL | re.IGNORECASE)
-        
-        # Remove any remaining opening or closing think tags
-        text = re.sub(r'</?think>', '', text, flags=re.IGNORECASE)
+        # Replies without any tag skip both tag passes
+        if '<' in text:
+            # Remove <think>...</think> blocks (case insensitive, multiline, greedy)
+            text = THINK_BLOCK_PATTERN.sub('', text)
+            
+            # Remove any remaining opening or closing think tags
+            text = THINK_TAG_PATTERN.sub('', text)
         
         # Also handle cases where think content might be at the beginning
         # Remove everything from start until first non-think content
@@ -1104,43 +1235,88 @@ Commands:
         
         # Rejoin and clean up extra whitespace/newlines
         text = '\n'.join(cleaned_lines)
-        text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)  # Replace multiple newlines with double newline
+        text = EXCESS_NEWLINES_PATTERN.sub('\n\n', text)  # Replace multiple newlines with double newline
         text = text.strip()  # Remove leading/trailing whitespace
         
         return text
     
     def _clean_markdown(self, text: str) -> str:
         """Clean problematic markdown characters that cause parsing errors"""
-        import re
-        
-        # Replace problematic characters
-        text = text.replace('`', "'")  # Replace backticks with single quotes
-        text = text.replace('*', '•')  # Replace asterisks with bullets
-        text = text.replace('_', '-')  # Replace underscores with dashes
-        text = text.replace('[', '(')  # Replace square brackets
-        text = text.replace(']', ')')
-        text = text.replace('#', '➤')  # Replace hash symbols
-        
-        # Remove problematic markdown patterns
-        text = re.sub(r'\*\*([^*]+)\*\*', r'**\1**', text)  # Fix bold formatting
-        text = re.sub(r'`([^`]+)`', r'"\1"', text)  # Replace code blocks with quotes
-        
-        return text
+        # Replace problematic characters in one pass. No asterisks or backticks survive
+        # the translation, so no bold or code patterns are left to rewrite afterwards
+        return text.translate(MARKDOWN_SAFE_TABLE)
+    
+    def _split_message(self, text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> Iterator[str]:
+        """Yield message-sized parts of text, breaking at paragraphs or lines where possible"""
+        start = 0
+        while len(text) - start > limit:
+            end = start + limit
+            # Prefer a paragraph break, then a line break, in the second half of the part
+            cut = text.rfind('\n\n', start + limit // 2, end)
+            if cut == -1:
+                cut = text.rfind('\n', start + limit // 2, end)
+            if cut == -1:
+                cut = end
+            yield text[start:cut]
+            start = cut
+            # Drop the newlines at the break so the next part doesn't start blank
+            while start < len(text) and text[start] == '\n':
+                start += 1
+        if start == 0 or start < len(text):
+            yield text[start:]
     
     def _strip_markdown(self, text: str) -> str:
         """Strip all markdown formatting for plain text fallback"""
-        import re
-        
         # Remove all markdown formatting
-        text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)  # Remove bold
-        text = re.sub(r'\*([^*]+)\*', r'\1', text)      # Remove italic
-        text = re.sub(r'`([^`]+)`', r'"\1"', text)      # Replace code with quotes
-        text = re.sub(r'#{1,6}\s*', '', text)           # Remove headers
-        text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)  # Remove links
+        text = MARKDOWN_BOLD_PATTERN.sub(r'\1', text)    # Remove bold
+        text = MARKDOWN_ITALIC_PATTERN.sub(r'\1', text)  # Remove italic
+        text = MARKDOWN_CODE_PATTERN.sub(r'"\1"', text)  # Replace code with quotes
+        text = MARKDOWN_HEADER_PATTERN.sub('', text)     # Remove headers
+        text = MARKDOWN_LINK_PATTERN.sub(r'\1', text)    # Remove links
         text = text.replace('_', ' ')                   # Replace underscores
         
         return text
     
+    def _prompt_messages(self, session: "ChatSession") -> List[Dict[str, Any]]:
+        """System prompt, a memory note of older questions and the last CHAT_HISTORY_TURNS user turns"""
+        messages = session.get_messages()
+        history = messages[1:]
+        
+        # Cut only at user messages so tool results always follow their tool calls
+        turns = 0
+        for i in range(len(history) - 1, -1, -1):
+            if history[i].get("role") == "user":
+                turns += 1
+                if turns == CHAT_HISTORY_TURNS:
+                    break
+        else:
+            i = 0
+        
+        system = messages[0]
+        memory_note = self._memory_note(history[:i])
+        if memory_note:
+            # Chat templates allow a single leading system message, so the note joins the system prompt
+            system = {**system, "content": f"{system.get('content') or ''}\n\n{memory_note}"}
+        return [system] + [self._prompt_message(message) for message in history[i:]]
+    
+    def _prompt_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Message as sent to the LLM; tool results are cut to TOOL_RESULT_MAX_CHARS (the session keeps them whole)"""
+        content = message.get("content") or ""
+        if message.get("role") != "tool" or len(content) <= TOOL_RESULT_MAX_CHARS:
+            return message
+        return {**message, "content": f"{content[:TOOL_RESULT_MAX_CHARS]}... [truncated {len(content) - TOOL_RESULT_MAX_CHARS} characters]"}
+    
+    def _memory_note(self, older_messages: List[Dict[str, Any]]) -> str:
+        """Compact note of the questions asked before the history window, so follow-ups keep their context"""
+        questions = [
+            (message.get("content") or "")[:MEMORY_NOTE_QUESTION_CHARS]
+            for message in older_messages
+            if message.get("role") == "user"
+        ][-MEMORY_NOTE_QUESTIONS:]
+        if not questions:
+            return ""
+        return "Earlier questions in this conversation:\n" + "\n".join(f"- {q}" for q in questions)
+    
     async def process_chat_message_async(self, session: "ChatSession", session_id: str) -> Dict[str, Any]:
         """Process chat message with LM Studio and MCP tools (ASYNC VERSION for Telegram)"""
         try:
@@ -1152,10 +1328,10 @@ Commands:
             logger.info(f"Sending request to LM Studio: {self.config.LM_STUDIO_CONFIG['base_url']}")
             logger.info(f"Model: {self.config.LM_STUDIO_CONFIG['model']}")
             
-            messages = session.get_messages()
+            messages = self._prompt_messages(session)
             logger.debug(f"Messages to send: {messages}")
             
-            response = self.llm_client.chat.completions.create(
+            response = await self.llm_client.chat.completions.create(
                 model=self.config.LM_STUDIO_CONFIG['model'],
                 messages=messages,
                 tools=session.mcp_tools,
@@ -1236,9 +1412,9 @@ Commands:
                 
                 # Get final response after tool execution
                 logger.info("Getting final response from LM Studio after tool execution...")
-                final_response = self.llm_client.chat.completions.create(
+                final_response = await self.llm_client.chat.completions.create(
                     model=self.config.LM_STUDIO_CONFIG['model'],
-                    messages=session.get_messages()
+                    messages=self._prompt_messages(session)
                 )
                 
                 final_message = final_response.choices[0].message.content
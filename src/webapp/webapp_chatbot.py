@@ -27,7 +27,6 @@ import itertools
 current_dir = Path(__file__).parent
 project_root = current_dir.parent.parent
 sys.path.insert(0, str(project_root))
-sys.path.insert(0, str(project_root / 'src'))
 
 # Add config directory to path
 sys.path.append(str(project_root))